@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import Appointment, BlackoutDate
+from .models import Appointment, BlackoutDate, CalendarFeedToken
 
 @admin.register(BlackoutDate)
 class BlackoutDateAdmin(admin.ModelAdmin):
     list_display = ("date", "reason")
-    ordering = ("date",)
\ No newline at end of file
+    ordering = ("date",)
+
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ("user", "created_at")
+    readonly_fields = ("key", "created_at")
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db import transaction
+
+# Occupancy entries are dropped on every write that can change them;
+# the timeout only bounds how long a missed invalidation can linger.
+SLOT_CACHE_TIMEOUT = 60 * 15
+
+# Stored instead of a bitmap when the whole day is blacked out
+CLOSED = "closed"
+
+
+def occupancy_key(date):
+    return f"appointments:occupancy:v2:{date.isoformat()}"
+
+
+def get_occupancy(dates):
+    """
+    Return {date: entry} for every date that has a cached entry.
+    """
+    keys = {occupancy_key(date): date for date in dates}
+    cached = cache.get_many(list(keys))
+    return {keys[key]: value for key, value in cached.items()}
+
+
+def set_occupancy(entries):
+    cache.set_many(
+        {occupancy_key(date): value for date, value in entries.items()},
+        timeout=SLOT_CACHE_TIMEOUT,
+    )
+
+
+def _bump_schedule_version():
+    # Imported here: the models module imports this one
+    from .models import ScheduleVersion
+
+    ScheduleVersion.bump()
+
+
+def invalidate_dates(*dates):
+    """
+    Bump the schedule version alongside the write and drop cached
+    occupancy for the given dates, again once the surrounding
+    transaction commits so readers cannot re-cache uncommitted state.
+    """
+    keys = list({occupancy_key(date) for date in dates if date})
+    if not keys:
+        return
+
+    _bump_schedule_version()
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# Reschedule holds: one key per occupancy cell, valued with the holding
+# appointment id and left to expire on their own.
+SLOT_HOLD_TTL = 60 * 5
+
+
+def hold_key(date, cell):
+    return f"appointments:hold:{date.isoformat()}:{cell}"
+
+
+def current_hold_key(appointment_id):
+    return f"appointments:hold-owner:{appointment_id}"
@@ -0,0 +1,97 @@
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+
+# RFC 5545 content lines are folded at 75 octets
+MAX_LINE_OCTETS = 75
+UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def _escape(value):
+    return (
+        str(value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """
+    Split a content line into CRLF-terminated chunks of at most
+    MAX_LINE_OCTETS, continuation lines starting with a space.
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + "\r\n"
+
+    chunks = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = MAX_LINE_OCTETS - 1
+
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime(UTC_FORMAT)
+
+
+def _event_lines(appointment, stamp, domain):
+    address = ", ".join(filter(None, [
+        appointment.customer_street_address,
+        appointment.customer_apt_suite,
+        appointment.customer_city,
+        " ".join(filter(None, [appointment.customer_state, appointment.customer_zip_code])),
+    ]))
+    details = "\n".join(filter(None, [
+        appointment.description,
+        appointment.customer_phone_number,
+        appointment.customer_email,
+    ]))
+
+    yield "BEGIN:VEVENT"
+    yield f"UID:appointment-{appointment.pk}@{domain}"
+    yield f"DTSTAMP:{stamp}"
+    yield f"DTSTART:{_utc(appointment.get_start())}"
+    yield f"DTEND:{_utc(appointment.get_end())}"
+    yield f"SUMMARY:{_escape(f'{appointment.customer_first_name} {appointment.customer_last_name}')}"
+    yield f"LOCATION:{_escape(address)}"
+    if details:
+        yield f"DESCRIPTION:{_escape(details)}"
+    yield "END:VEVENT"
+
+
+def iter_calendar(appointments, domain):
+    """
+    Yield an iCalendar document for ``appointments`` one folded
+    content line at a time.
+    """
+    name = settings.COMPANY_NAME or "Appointments"
+    stamp = _utc(timezone.now())
+
+    header = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//{_escape(name)}//Appointments//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"X-WR-TIMEZONE:{settings.TIME_ZONE}",
+    ]
+    for line in header:
+        yield _fold(line)
+
+    for appointment in appointments:
+        for line in _event_lines(appointment, stamp, domain):
+            yield _fold(line)
+
+    yield _fold("END:VCALENDAR")
@@ -0,0 +1,84 @@
+import random
+import statistics
+from datetime import date, timedelta
+
+from rest_framework.test import APIRequestFactory
+
+from appointments.models import Appointment
+from appointments.pagination import AppointmentKeysetPagination
+from appointments.views import AppointmentViewSet
+from handyman.bench import BenchCommand, bench_appointment
+
+
+class Command(BenchCommand):
+    help = "Time appointment list pages against growing synthetic data (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10000,50000,100000",
+            help="Comma-separated table sizes to measure at",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="Requests timed per measurement",
+        )
+
+    def bench(self, options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        repeat = options["repeat"]
+        self._booked = set()
+
+        factory = APIRequestFactory()
+        view = AppointmentViewSet.as_view({"get": "list"})
+        paginator = AppointmentKeysetPagination()
+
+        def get(query):
+            response = view(factory.get(f"/api/appointments/{query}"))
+            response.render()
+            assert response.status_code == 200, response.content
+
+        def timed(query):
+            return statistics.mean(self.timed(lambda: get(query), repeat))
+
+        self.stdout.write(
+            f"{'rows':>8} {'first page':>12} {'deep cursor':>12} {'accepted+date':>14}"
+        )
+
+        seeded = 0
+        for size in sizes:
+            self._seed(size - seeded)
+            seeded = size
+
+            deep = (
+                Appointment.objects
+                .order_by(*paginator.ordering)
+                [int(size * 0.9)]
+            )
+            cursor = paginator.encode_cursor(deep)
+
+            self.stdout.write(
+                f"{size:>8} "
+                f"{timed('?'):>10.2f}ms "
+                f"{timed(f'?cursor={cursor}'):>10.2f}ms "
+                f"{timed(f'?status=A&date={deep.requested_date}'):>12.2f}ms"
+            )
+
+    def _seed(self, count):
+        start = date(2020, 1, 1)
+        booked = self._booked
+        rows = []
+        for _ in range(count):
+            day = start + timedelta(days=random.randrange(3650))
+            hour = random.randrange(8, 17)
+
+            status = random.choice("PAD")
+            if status == "A" and (day, hour) in booked:
+                status = "P"
+            if status == "A":
+                booked.add((day, hour))
+
+            rows.append(bench_appointment(day, hour, status))
+        Appointment.objects.bulk_create(rows, batch_size=2000)
@@ -0,0 +1,98 @@
+import random
+import statistics
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.cache import occupancy_key
+from appointments.models import Appointment, BlackoutDate
+from appointments.scheduling import generate_time_slots, iter_time_slots
+from handyman.bench import BenchCommand, bench_appointment
+
+
+class Command(BenchCommand):
+    help = "Compare per-day slot generation with the batched range generator"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=42,
+            help="Number of days in the window (a month view is 35-42)",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=200,
+            help="Synthetic accepted appointments to seed (rolled back afterwards)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Timing iterations for each strategy",
+        )
+
+    def bench(self, options):
+        days = options["days"]
+        repeat = options["repeat"]
+        start = timezone.localdate()
+        end = start + timedelta(days=days - 1)
+
+        self._seed(start, days, options["bookings"])
+
+        def per_day():
+            return [
+                generate_time_slots(start + timedelta(days=i))
+                for i in range(days)
+            ]
+
+        def batched():
+            return [slots for _, slots in iter_time_slots(start, end)]
+
+        window = [occupancy_key(start + timedelta(days=i)) for i in range(days)]
+
+        def drop_cache():
+            cache.delete_many(window)
+
+        drop_cache()
+        assert per_day() == batched(), "strategies disagree"
+
+        strategies = (("per-day loop", per_day), ("range generator", batched))
+        for cold in (True, False):
+            for label, fn in strategies:
+                drop_cache()
+                if not cold:
+                    fn()
+
+                with CaptureQueriesContext(connection) as ctx:
+                    fn()
+                queries = len(ctx.captured_queries)
+
+                timings = self.timed(fn, repeat, before=drop_cache if cold else None)
+
+                self.stdout.write(
+                    f"{label:<16} {'cold' if cold else 'warm'} "
+                    f"{statistics.mean(timings):8.2f} ms/window "
+                    f"{queries:4d} queries"
+                )
+
+        drop_cache()
+
+    def _seed(self, start, days, count):
+        taken = set()
+        rows = []
+        for _ in range(count):
+            day = start + timedelta(days=random.randrange(days))
+            hour = random.randrange(8, 17)
+            if (day, hour) in taken:
+                continue
+            taken.add((day, hour))
+            rows.append(bench_appointment(day, hour))
+        Appointment.objects.bulk_create(rows)
+
+        blackout = start + timedelta(days=days // 2)
+        BlackoutDate.objects.get_or_create(date=blackout)
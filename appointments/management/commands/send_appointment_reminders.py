@@ -0,0 +1,56 @@
+import logging
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import Appointment
+from appointments.utils import queue_reminder_emails, reminder_pushes
+from notifications.push import send_mobile_push_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Queue reminders for accepted appointments starting in the next few hours"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Remind appointments starting within this many hours",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Appointments claimed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        start = timezone.localtime().replace(tzinfo=None)
+        end = start + timedelta(hours=options["hours"])
+
+        emailed = pushed = 0
+
+        while True:
+            # The marker and the queued emails commit together, so a
+            # rerun or crash can never send a reminder twice
+            with transaction.atomic():
+                batch = Appointment.claim_reminders(start, end, options["batch_size"])
+                if not batch:
+                    break
+                queue_reminder_emails(batch)
+
+            emailed += len(batch)
+
+            try:
+                pushed += send_mobile_push_batch(reminder_pushes(batch))
+            except Exception:
+                logger.exception("Failed to send reminder push notifications")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Queued {emailed} reminder emails, sent {pushed} pushes")
+        )
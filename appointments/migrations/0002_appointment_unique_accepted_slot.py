@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('accepted', 'A')), fields=('requested_date', 'requested_time'), name='unique_accepted_appointment_slot'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:40
+
+from datetime import datetime, time, timedelta
+from django.db import migrations, models
+
+
+def fill_end_time(apps, schema_editor):
+    Appointment = apps.get_model("appointments", "Appointment")
+
+    appointments = list(Appointment.objects.only("requested_date", "requested_time", "duration_minutes"))
+    for appointment in appointments:
+        end = (
+            datetime.combine(appointment.requested_date, appointment.requested_time)
+            + timedelta(minutes=appointment.duration_minutes)
+        )
+        appointment.end_time = end.time() if end.date() == appointment.requested_date else time.max
+
+    Appointment.objects.bulk_update(appointments, ["end_time"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_unique_accepted_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['accepted', 'requested_date', 'requested_time', 'end_time'], name='appointment_interval_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_appointment_duration'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['requested_date', 'requested_time', 'id'], name='appointment_keyset_idx'),
+        ),
+    ]
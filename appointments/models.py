@@ -1,7 +1,13 @@
-from django.db import models, transaction
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import Exists, OuterRef, Q
+from collections import defaultdict
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+import secrets
 import uuid
+from .cache import invalidate_dates
 
 User = get_user_model()
 
@@ -63,6 +69,7 @@ class Appointment(models.Model):
         ("A", "Accepted"),
         ("D", "Declined"),
     ]
+    DEFAULT_DURATION_MINUTES = 60
 
     customer_first_name = models.CharField(max_length=50)
     customer_last_name = models.CharField(max_length=50)
@@ -77,6 +84,9 @@ class Appointment(models.Model):
 
     requested_date = models.DateField()
     requested_time = models.TimeField()
+    duration_minutes = models.PositiveIntegerField(default=DEFAULT_DURATION_MINUTES)
+    # Denormalized requested_time + duration so overlaps are plain range predicates
+    end_time = models.TimeField(editable=False)
     description = models.TextField(blank=True, null=True)
 
     accepted = models.CharField(
@@ -91,6 +101,28 @@ class Appointment(models.Model):
         unique=True,
     )
 
+    # Set when the reminder is queued; cleared when the booking moves
+    reminder_sent_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["requested_date", "requested_time"],
+                condition=models.Q(accepted="A"),
+                name="unique_accepted_appointment_slot",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["accepted", "requested_date", "requested_time", "end_time"],
+                name="appointment_interval_idx",
+            ),
+            models.Index(
+                fields=["requested_date", "requested_time", "id"],
+                name="appointment_keyset_idx",
+            ),
+        ]
+
     def __str__(self):
         return (
             f"{self.customer_first_name} {self.customer_last_name} "
@@ -108,28 +140,127 @@ class Appointment(models.Model):
     def accepted_appointments(cls):
         return cls.objects.filter(accepted="A")
 
+    @classmethod
+    def overlapping(cls, date, start, end):
+        """
+        Appointments on ``date`` whose interval intersects [start, end).
+        """
+        return cls.objects.filter(
+            requested_date=date,
+            requested_time__lt=end,
+            end_time__gt=start,
+        )
+
+    @classmethod
+    def lock_days(cls, *dates):
+        """
+        Row-lock every appointment on ``dates`` until the surrounding
+        transaction ends. Rows are locked in pk order so two callers
+        covering the same day queue instead of deadlocking.
+
+        SQLite has no row locks and already serializes writers; reading
+        first there would only turn the later UPDATE into a lock upgrade
+        that fails with "database is locked".
+        """
+        if not connection.features.has_select_for_update:
+            return
+        list(
+            cls.objects.select_for_update()
+            .filter(requested_date__in=dates)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    @classmethod
+    def starting_between(cls, start, end):
+        """
+        Appointments starting in [start, end), given as naive local
+        datetimes. Expressed on (requested_date, requested_time) so the
+        interval index serves it as one range scan.
+        """
+        return cls.objects.filter(
+            Q(requested_date__gt=start.date())
+            | Q(requested_date=start.date(), requested_time__gte=start.time()),
+            Q(requested_date__lt=end.date())
+            | Q(requested_date=end.date(), requested_time__lt=end.time()),
+        )
+
+    # ---------------------------------
+    # Interval helpers
+    # ---------------------------------
+    def get_duration(self):
+        return timedelta(minutes=self.duration_minutes)
+
+    def get_start(self):
+        return timezone.make_aware(
+            datetime.combine(self.requested_date, self.requested_time),
+            timezone.get_current_timezone()
+        )
+
+    def get_end(self):
+        return timezone.make_aware(
+            datetime.combine(self.requested_date, self.requested_time) + self.get_duration(),
+            timezone.get_current_timezone()
+        )
+
+    def get_end_time(self):
+        """
+        End of the booking, clamped to the end of requested_date.
+        """
+        end = datetime.combine(self.requested_date, self.requested_time) + self.get_duration()
+        if end.date() != self.requested_date:
+            return time.max
+        return end.time()
+
     # ---------------------------------
     # Domain actions
     # ---------------------------------
     def accept_request(self):
         """
         Accept this appointment and automatically decline
-        all other appointments for the same time slot.
+        all other pending appointments that overlap it.
+
+        The day's appointments are row-locked first, so concurrent
+        accepts on the same date run one after another; acceptance is
+        then one conditional UPDATE that only matches while no accepted
+        appointment overlaps this one. The partial unique constraint
+        only catches two bookings at the identical start time. Losing
+        raises ValidationError.
         """
-        with transaction.atomic():
-            # Validate conflict ONLY for acceptance
-            self.full_clean()
+        slot_taken = Appointment.objects.filter(
+            requested_date=OuterRef("requested_date"),
+            requested_time__lt=OuterRef("end_time"),
+            end_time__gt=OuterRef("requested_time"),
+            accepted="A",
+        ).exclude(pk=OuterRef("pk"))
 
-            # Accept this appointment
-            self.accepted = "A"
-            self.save(update_fields=["accepted"])
+        try:
+            with transaction.atomic():
+                Appointment.lock_days(self.requested_date)
+                won = (
+                    Appointment.objects
+                    .filter(pk=self.pk)
+                    .exclude(Exists(slot_taken))
+                    .update(accepted="A")
+                )
 
-            # Decline all others for same slot
-            Appointment.objects.filter(
-                requested_date=self.requested_date,
-                requested_time=self.requested_time,
-                accepted="P",
-            ).exclude(pk=self.pk).update(accepted="D")
+                if won:
+                    # Decline all others overlapping this booking
+                    Appointment.overlapping(
+                        self.requested_date,
+                        self.requested_time,
+                        self.end_time,
+                    ).filter(accepted="P").exclude(pk=self.pk).update(accepted="D")
+        except IntegrityError:
+            won = 0
+
+        if not won:
+            raise ValidationError(
+                {"requested_time": "This time slot is already booked."}
+            )
+
+        self.accepted = "A"
+        invalidate_dates(self.requested_date)
 
     def decline_request(self):
         """
@@ -138,21 +269,144 @@ class Appointment(models.Model):
         self.accepted = "D"
         self.save(update_fields=["accepted"])
 
+    @classmethod
+    def accept_many(cls, ids):
+        """
+        Accept a batch of pending appointments in one transaction.
+
+        Requests are considered oldest first; one that overlaps an
+        accepted booking or an earlier winner in the batch is declined.
+        Winners, batch losers and other pending requests overlapping a
+        winner are each written with a single UPDATE.
+
+        Returns (accepted, declined) lists of appointments.
+        """
+        with transaction.atomic():
+            cls.lock_days(*cls.objects.filter(pk__in=ids).values_list(
+                "requested_date", flat=True
+            ).distinct())
+            batch = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=ids, accepted="P")
+                .order_by("pk")
+            )
+            dates = {a.requested_date for a in batch}
+
+            taken = defaultdict(list)
+            for date, start, end in cls.objects.filter(
+                requested_date__in=dates,
+                accepted="A",
+            ).values_list("requested_date", "requested_time", "end_time"):
+                taken[date].append((start, end))
+
+            accepted, declined = [], []
+            for appointment in batch:
+                start, end = appointment.requested_time, appointment.end_time
+                day = taken[appointment.requested_date]
+
+                if any(s < end and e > start for s, e in day):
+                    declined.append(appointment)
+                else:
+                    day.append((start, end))
+                    accepted.append(appointment)
+
+            if accepted:
+                cls.objects.filter(pk__in=[a.pk for a in accepted]).update(accepted="A")
+
+                overlaps = Q()
+                for a in accepted:
+                    overlaps |= Q(
+                        requested_date=a.requested_date,
+                        requested_time__lt=a.end_time,
+                        end_time__gt=a.requested_time,
+                    )
+                cls.objects.filter(overlaps, accepted="P").exclude(
+                    pk__in=[a.pk for a in batch]
+                ).update(accepted="D")
+
+            if declined:
+                cls.objects.filter(pk__in=[a.pk for a in declined]).update(accepted="D")
+
+        for appointment in accepted:
+            appointment.accepted = "A"
+        for appointment in declined:
+            appointment.accepted = "D"
+
+        invalidate_dates(*dates)
+        return accepted, declined
+
+    @classmethod
+    def decline_many(cls, ids):
+        """
+        Decline a batch of appointments with a single UPDATE.
+        Returns the declined appointments.
+        """
+        with transaction.atomic():
+            batch = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=ids)
+                .exclude(accepted="D")
+            )
+            cls.objects.filter(pk__in=[a.pk for a in batch]).update(accepted="D")
+
+        freed = {a.requested_date for a in batch if a.accepted == "A"}
+        for appointment in batch:
+            appointment.accepted = "D"
+
+        invalidate_dates(*freed)
+        return batch
+
+    @classmethod
+    def claim_reminders(cls, start, end, limit=500):
+        """
+        Mark up to ``limit`` accepted appointments starting in
+        [start, end) that have not been reminded yet, and return them.
+
+        Rows locked by a concurrent run are skipped, so when the caller
+        queues the reminders in the same transaction each appointment
+        is reminded exactly once.
+        """
+        now = timezone.now()
+
+        with transaction.atomic():
+            batch = list(
+                cls.starting_between(start, end)
+                .select_for_update(skip_locked=True)
+                .filter(accepted="A", reminder_sent_at__isnull=True)
+                .order_by("requested_date", "requested_time", "id")[:limit]
+            )
+            cls.objects.filter(
+                pk__in=[a.pk for a in batch]
+            ).update(reminder_sent_at=now)
+
+        for appointment in batch:
+            appointment.reminder_sent_at = now
+        return batch
+
     # ---------------------------------
     # Validation
     # ---------------------------------
     def clean(self):
         """
-        Only block conflicts when attempting to ACCEPT.
+        Reject bookings that run past midnight, and only block
+        conflicts when attempting to ACCEPT.
         """
+        if None in (self.requested_date, self.requested_time, self.duration_minutes):
+            return
+
+        if self.duration_minutes < 1 or self.get_end_time() == time.max:
+            raise ValidationError(
+                {"duration_minutes": "Appointment must end on the same day."}
+            )
+
         if self.accepted != "A":
             return
 
-        conflict = Appointment.objects.filter(
-            requested_date=self.requested_date,
-            requested_time=self.requested_time,
-            accepted="A",
-        ).exclude(pk=self.pk)
+        conflict = Appointment.overlapping(
+            self.requested_date,
+            self.requested_time,
+            self.get_end_time(),
+        ).filter(accepted="A").exclude(pk=self.pk)
 
         if conflict.exists():
             raise ValidationError(
@@ -167,12 +421,54 @@ class Appointment(models.Model):
         Only auto-validate on normal saves.
         Accept/decline should be done via methods.
         """
+        self.end_time = self.get_end_time()
+
         if "update_fields" not in kwargs:
             self.full_clean()
+        elif {"requested_time", "duration_minutes"} & set(kwargs["update_fields"] or ()):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "end_time"}
         super().save(*args, **kwargs)
 
 class BlackoutDate(models.Model): 
     date = models.DateField(unique=True)
     reason = models.CharField(max_length=100, blank=True)
     def __str__(self):
-        return f"{self.date} - {self.reason or 'Blackout'}"
\ No newline at end of file
+        return f"{self.date} - {self.reason or 'Blackout'}"
+
+
+def generate_feed_key():
+    return secrets.token_hex(20)
+
+
+class CalendarFeedToken(models.Model):
+    """
+    Key for a staff user's iCalendar feed URL. It grants access to the
+    feed only, and deleting it revokes every subscription that uses it.
+    """
+    key = models.CharField(max_length=40, unique=True, default=generate_feed_key)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="calendar_feed_token",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendar feed for {self.user}"
+
+
+class ScheduleVersion(models.Model):
+    """
+    Single-row counter bumped in the same transaction as every schedule
+    write, so every worker derives the same calendar feed ETag from it.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=models.F("version") + 1):
+            cls.objects.get_or_create(pk=1, defaults={"version": 1})
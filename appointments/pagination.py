@@ -0,0 +1,99 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, time
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AppointmentKeysetPagination(BasePagination):
+    """
+    Keyset pagination ordered by (-requested_date, -requested_time, -id).
+
+    The cursor holds the key of the last row served, so every page is
+    a bounded range scan on the (requested_date, requested_time, id)
+    index however deep the client pages.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    ordering = ("-requested_date", "-requested_time", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(*self.decode_cursor(cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def after(self, requested_date, requested_time, pk):
+        """
+        Rows strictly after the given key in descending order.
+        """
+        return Q(requested_date__lte=requested_date) & (
+            Q(requested_date__lt=requested_date)
+            | Q(requested_time__lt=requested_time)
+            | Q(requested_time=requested_time, id__lt=pk)
+        )
+
+    def encode_cursor(self, appointment):
+        key = (
+            f"{appointment.requested_date.isoformat()}|"
+            f"{appointment.requested_time.isoformat()}|"
+            f"{appointment.pk}"
+        )
+        return urlsafe_b64encode(key.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw_date, raw_time, pk = (
+                urlsafe_b64decode(cursor.encode()).decode().split("|")
+            )
+            return date.fromisoformat(raw_date), time.fromisoformat(raw_time), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -1,54 +1,285 @@
-from datetime import datetime, timedelta
-from django.utils import timezone
+from collections import defaultdict
+from datetime import datetime, time, timedelta
 from django.conf import settings
+from django.core.cache import cache
 from .models import Appointment, BlackoutDate
+from .cache import (
+    CLOSED,
+    SLOT_HOLD_TTL,
+    get_occupancy,
+    set_occupancy,
+    hold_key,
+    current_hold_key,
+)
 
-APPOINTMENT_DURATION = timedelta(hours=1)
+APPOINTMENT_DURATION = timedelta(
+    minutes=Appointment.DEFAULT_DURATION_MINUTES
+)
 
-def generate_time_slots(date, exclude_appointment_id=None):
-    # 🚫 FULL DAY CLOSED
-    if BlackoutDate.objects.filter(date=date).exists():
-        return []
+# Occupancy is tracked in cells of this size; slots start every SLOT_STEP.
+SLOT_RESOLUTION = timedelta(minutes=30)
+SLOT_STEP = timedelta(hours=1)
 
-    weekday = date.weekday()
-    business_hours = settings.BUSINESS_HOURS_BY_WEEKDAY
+# Longest window the range API will compute in one request
+MAX_SLOT_RANGE_DAYS = 62
 
-    if weekday not in business_hours:
-        return []
 
-    start_time, end_time = business_hours[weekday]
-    tz = timezone.get_current_timezone()
+def _business_window(date):
+    """
+    Opening and closing datetimes for ``date``, or None when closed.
+    """
+    business_hours = settings.BUSINESS_HOURS_BY_WEEKDAY
+
+    if date.weekday() not in business_hours:
+        return None
 
-    start_dt = timezone.make_aware(
-        datetime.combine(date, start_time), tz
-    )
-    end_dt = timezone.make_aware(
-        datetime.combine(date, end_time), tz
+    start_time, end_time = business_hours[date.weekday()]
+    return (
+        datetime.combine(date, start_time),
+        datetime.combine(date, end_time),
     )
 
-    qs = Appointment.objects.filter(
-        requested_date=date,
-        accepted="A"
+
+def _cell_count(window):
+    opens, closes = window
+    return max(int((closes - opens) / SLOT_RESOLUTION), 0)
+
+
+def _interval_mask(window, start_time, end_time):
+    """
+    Bitmask of the cells [start_time, end_time) touches, where bit ``i``
+    is the i-th SLOT_RESOLUTION cell after opening.
+    """
+    opens, _ = window
+    cells = _cell_count(window)
+
+    start = datetime.combine(opens.date(), start_time) - opens
+    end = datetime.combine(opens.date(), end_time) - opens
+
+    first = max(int(start // SLOT_RESOLUTION), 0)
+    last = min(-int(-end // SLOT_RESOLUTION), cells)
+
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def _cells(mask):
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def _load_holds(dates, holder_id=None):
+    """
+    Return {date: bitmap} of cells held by anyone other than
+    ``holder_id``, fetched with a single cache round trip.
+    """
+    keys = {}
+    for date in dates:
+        window = _business_window(date)
+        if window:
+            for cell in range(_cell_count(window)):
+                keys[hold_key(date, cell)] = (date, cell)
+
+    held = defaultdict(int)
+    for key, holder in cache.get_many(list(keys)).items():
+        if str(holder) != str(holder_id):
+            date, cell = keys[key]
+            held[date] |= 1 << cell
+
+    return held
+
+
+def _load_occupancy(dates):
+    """
+    Return {date: entry} for ``dates``. An entry is either CLOSED or
+    ``(bitmap, owners)`` where ``owners`` pairs each accepted
+    appointment id with the cell mask it occupies.
+
+    Cached entries are served without touching the database; misses
+    are loaded together with one blackout and one booking query.
+    """
+    entries = get_occupancy(dates)
+    missing = [date for date in dates if date not in entries]
+
+    if not missing:
+        return entries
+
+    blackouts = set(
+        BlackoutDate.objects
+        .filter(date__in=missing)
+        .values_list("date", flat=True)
     )
 
+    windows = {
+        date: _business_window(date)
+        for date in missing
+        if date not in blackouts
+    }
+    open_dates = [date for date, window in windows.items() if window]
+
+    bitmaps = dict.fromkeys(windows, 0)
+    owners = defaultdict(list)
+
+    if open_dates:
+        booked = Appointment.objects.filter(
+            requested_date__in=open_dates,
+            accepted="A",
+        ).values_list("id", "requested_date", "requested_time", "end_time")
+
+        for pk, requested_date, start_time, end_time in booked:
+            mask = _interval_mask(windows[requested_date], start_time, end_time)
+            if not mask:
+                continue
+            bitmaps[requested_date] |= mask
+            owners[requested_date].append((pk, mask))
+
+    loaded = {date: CLOSED for date in blackouts}
+    for date, bitmap in bitmaps.items():
+        loaded[date] = (bitmap, tuple(owners[date]))
+
+    set_occupancy(loaded)
+    entries.update(loaded)
+    return entries
+
+
+def _build_slots(date, entry, exclude_appointment_id=None, duration=APPOINTMENT_DURATION, held=0):
+    window = _business_window(date)
+
+    if entry == CLOSED or window is None:
+        return []
+
+    bitmap, owners = entry
+
     if exclude_appointment_id:
-        qs = qs.exclude(id=exclude_appointment_id)
+        bitmap = 0
+        for pk, mask in owners:
+            if str(pk) != str(exclude_appointment_id):
+                bitmap |= mask
 
-    booked_times = set(qs.values_list("requested_time", flat=True))
+    bitmap |= held
 
-    slots = []
-    current = start_dt
+    opens, closes = window
+    needed = (1 << -int(-duration // SLOT_RESOLUTION)) - 1
+    step = int(SLOT_STEP // SLOT_RESOLUTION)
 
-    while current + APPOINTMENT_DURATION <= end_dt:
-        slot_time = current.time()
+    slots = []
+    current = opens
+    offset = 0
 
-        if slot_time not in booked_times:
+    while current + duration <= closes:
+        if not bitmap & (needed << offset):
+            slot_time = current.time()
             slots.append({
                 "date": date.isoformat(),
                 "time": slot_time.strftime("%H:%M"),
                 "label": slot_time.strftime("%I:%M %p"),
             })
 
-        current += APPOINTMENT_DURATION
+        current += SLOT_STEP
+        offset += step
 
     return slots
+
+
+def generate_time_slots(date, exclude_appointment_id=None, duration=APPOINTMENT_DURATION):
+    if _business_window(date) is None:
+        return []
+
+    entry = _load_occupancy([date])[date]
+    held = _load_holds([date], exclude_appointment_id)[date]
+    return _build_slots(date, entry, exclude_appointment_id, duration, held)
+
+
+def iter_time_slots(start_date, end_date, exclude_appointment_id=None, duration=APPOINTMENT_DURATION):
+    """
+    Yield ``(date, slots)`` for every day from start_date to end_date
+    (inclusive).
+
+    Occupancy for the whole window is fetched on the first iteration
+    (from the cache, or with one blackout query and one booking query
+    for the days that are not cached), so callers can stream the days
+    out as they are produced.
+    """
+    dates = [
+        start_date + timedelta(days=i)
+        for i in range((end_date - start_date).days + 1)
+    ]
+    entries = _load_occupancy(dates)
+    held = _load_holds(dates, exclude_appointment_id)
+
+    for date in dates:
+        yield date, _build_slots(
+            date, entries[date], exclude_appointment_id, duration, held[date]
+        )
+
+
+def _hold_keys(appointment, date, start):
+    window = _business_window(date)
+    if window is None:
+        return []
+
+    end = datetime.combine(date, start) + appointment.get_duration()
+    end_time = end.time() if end.date() == date else time.max
+
+    return [
+        hold_key(date, cell)
+        for cell in _cells(_interval_mask(window, start, end_time))
+    ]
+
+
+def place_slot_hold(appointment, date, start):
+    """
+    Reserve [start, start + duration) on ``date`` for ``appointment``
+    for SLOT_HOLD_TTL seconds, releasing any slot it held before.
+
+    Each cell is claimed with an atomic cache add, so two customers can
+    never both hold an overlapping slot. Returns False if another hold
+    got there first.
+    """
+    keys = _hold_keys(appointment, date, start)
+    if not keys:
+        return False
+
+    placed = []
+    for key in keys:
+        if cache.add(key, appointment.pk, SLOT_HOLD_TTL):
+            placed.append(key)
+        elif cache.get(key) == appointment.pk:
+            cache.touch(key, SLOT_HOLD_TTL)
+        else:
+            cache.delete_many(placed)
+            return False
+
+    previous = cache.get(current_hold_key(appointment.pk))
+    if previous and previous != (date, start):
+        stale = set(_hold_keys(appointment, *previous)) - set(keys)
+        _release_keys(appointment, stale)
+
+    cache.set(current_hold_key(appointment.pk), (date, start), SLOT_HOLD_TTL)
+    return True
+
+
+def holds_slot(appointment, date, start):
+    """
+    True while ``appointment`` holds every cell of the slot.
+    """
+    keys = _hold_keys(appointment, date, start)
+    if not keys:
+        return False
+
+    held = cache.get_many(keys)
+    return len(held) == len(keys) and all(
+        holder == appointment.pk for holder in held.values()
+    )
+
+
+def _release_keys(appointment, keys):
+    held = cache.get_many(list(keys))
+    cache.delete_many([
+        key for key, holder in held.items() if holder == appointment.pk
+    ])
+
+
+def release_slot_hold(appointment, date, start):
+    _release_keys(appointment, _hold_keys(appointment, date, start))
+    cache.delete(current_hold_key(appointment.pk))
@@ -32,33 +32,41 @@ class AppointmentSerializer(serializers.ModelSerializer):
             # Appointment info
             "requested_date",
             "requested_time",
+            "duration_minutes",
+            "end_time",
             "description",
             "accepted",
             "status_display",
             "start",
             "end",
         ]
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "end_time"]
+
+    def validate(self, attrs):
+        date = attrs.get("requested_date", getattr(self.instance, "requested_date", None))
+        start = attrs.get("requested_time", getattr(self.instance, "requested_time", None))
+        minutes = attrs.get(
+            "duration_minutes",
+            getattr(self.instance, "duration_minutes", Appointment.DEFAULT_DURATION_MINUTES),
+        )
+
+        if date and start:
+            end = datetime.combine(date, start) + timedelta(minutes=minutes)
+            if minutes < 1 or end.date() != date:
+                raise serializers.ValidationError(
+                    {"duration_minutes": "Appointment must end on the same day."}
+                )
+
+        return attrs
 
     def get_customer_full_name(self, obj):
         return f"{obj.customer_first_name} {obj.customer_last_name}"
 
     def get_start(self, obj):
-        dt = datetime.combine(obj.requested_date, obj.requested_time)
-        aware_dt = timezone.make_aware(
-            dt,
-            timezone.get_current_timezone()
-        )
-        return timezone.localtime(aware_dt).isoformat()
-
+        return timezone.localtime(obj.get_start()).isoformat()
 
     def get_end(self, obj):
-        dt = datetime.combine(obj.requested_date, obj.requested_time) + timedelta(hours=1)
-        aware_dt = timezone.make_aware(
-            dt,
-            timezone.get_current_timezone()
-        )
-        return timezone.localtime(aware_dt).isoformat()
+        return timezone.localtime(obj.get_end()).isoformat()
 
 class PublicAppointmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -67,5 +75,6 @@ class PublicAppointmentSerializer(serializers.ModelSerializer):
             "customer_first_name",
             "requested_date",
             "requested_time",
+            "duration_minutes",
             "description",
         ]
\ No newline at end of file
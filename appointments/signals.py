@@ -0,0 +1,50 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Appointment, BlackoutDate
+from .cache import invalidate_dates
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_date(sender, instance, update_fields=None, **kwargs):
+    instance._previous_date = None
+    if instance.pk and (update_fields is None or "requested_date" in update_fields):
+        previous = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list("requested_date", "requested_time")
+            .first()
+        )
+        if previous:
+            instance._previous_date = previous[0]
+
+            # A moved booking needs a fresh reminder
+            if update_fields is None and previous != (instance.requested_date, instance.requested_time):
+                instance.reminder_sent_at = None
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_slots(sender, instance, **kwargs):
+    invalidate_dates(
+        instance.requested_date,
+        getattr(instance, "_previous_date", None),
+    )
+
+
+@receiver(pre_save, sender=BlackoutDate)
+def remember_blackout_date(sender, instance, **kwargs):
+    instance._previous_date = None
+    if instance.pk:
+        instance._previous_date = (
+            BlackoutDate.objects.filter(pk=instance.pk)
+            .values_list("date", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=BlackoutDate)
+@receiver(post_delete, sender=BlackoutDate)
+def invalidate_blackout_slots(sender, instance, **kwargs):
+    invalidate_dates(
+        instance.date,
+        getattr(instance, "_previous_date", None),
+    )
@@ -1,3 +1,511 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from outbox.models import OutboundEmail
+
+from .cache import get_occupancy
+from .models import Appointment, BlackoutDate, CalendarFeedToken, ScheduleVersion
+from .scheduling import (
+    MAX_SLOT_RANGE_DAYS,
+    generate_time_slots,
+    holds_slot,
+    iter_time_slots,
+    place_slot_hold,
+    release_slot_hold,
+)
+
+# Weekdays 8am-5pm; 2030-01-07 is a Monday
+BUSINESS_HOURS = {weekday: (time(8, 0), time(17, 0)) for weekday in range(5)}
+
+
+def make_appointment(**kwargs):
+    fields = {
+        "customer_first_name": "Test",
+        "customer_last_name": "Customer",
+        "customer_email": "test@example.com",
+        "customer_street_address": "1 Main St",
+        "customer_city": "Austin",
+        "requested_date": date(2030, 1, 7),
+        "requested_time": time(9, 0),
+        "end_time": time(10, 0),
+        "accepted": "P",
+    }
+    fields.update(kwargs)
+    return Appointment.objects.create(**fields)
+
+
+class ConcurrentAcceptTests(TransactionTestCase):
+    workers = 8
+
+    def setUp(self):
+        # Every thread needs its own connection to the same database
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database")
+
+    def accept_in_parallel(self, appointments):
+        barrier = threading.Barrier(len(appointments))
+        results = []
+        lock = threading.Lock()
+
+        def accept(appointment):
+            try:
+                barrier.wait()
+                appointment.accept_request()
+                outcome = "won"
+            except ValidationError:
+                outcome = "conflict"
+            except Exception as e:
+                outcome = f"error: {e!r}"
+            finally:
+                connection.close()
+
+            with lock:
+                results.append(outcome)
+
+        threads = [
+            threading.Thread(target=accept, args=(appointment,))
+            for appointment in appointments
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_winner_per_slot(self):
+        appointments = [
+            make_appointment(customer_last_name=str(i))
+            for i in range(self.workers)
+        ]
+
+        results = self.accept_in_parallel(appointments)
+
+        self.assertEqual(results.count("won"), 1, results)
+        self.assertEqual(results.count("conflict"), self.workers - 1, results)
+        self.assertEqual(Appointment.objects.filter(accepted="A").count(), 1)
+
+    def test_one_winner_among_overlapping_intervals(self):
+        appointments = [
+            make_appointment(
+                customer_last_name=str(i),
+                requested_time=time(9, 30) if i % 2 else time(9, 0),
+                end_time=time(10, 30) if i % 2 else time(10, 0),
+            )
+            for i in range(self.workers)
+        ]
+
+        results = self.accept_in_parallel(appointments)
+
+        self.assertEqual(results.count("won"), 1, results)
+        self.assertEqual(Appointment.objects.filter(accepted="A").count(), 1)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="pw", is_staff=True
+        )
+        self.feed_token = CalendarFeedToken.objects.create(user=self.staff)
+        self.url = reverse("appointments-calendar", kwargs={"key": self.feed_token.key})
+
+    def test_api_token_does_not_open_the_feed(self):
+        api_token = Token.objects.create(user=self.staff)
+        url = reverse("appointments-calendar", kwargs={"key": api_token.key})
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_etag_changes_with_the_schedule(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        BlackoutDate.objects.create(date=date(2030, 1, 8))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(BUSINESS_HOURS_BY_WEEKDAY=BUSINESS_HOURS)
+class SlotRangeTests(TestCase):
+    start = date(2030, 1, 7)
+    end = date(2030, 1, 20)
+    url = reverse("appointment-available-slots")
+
+    def setUp(self):
+        cache.clear()
+        make_appointment(accepted="A")
+        make_appointment(
+            requested_date=date(2030, 1, 9),
+            requested_time=time(13, 30),
+            end_time=time(15, 0),
+            accepted="A",
+        )
+        make_appointment(requested_date=date(2030, 1, 10))
+        BlackoutDate.objects.create(date=date(2030, 1, 14))
+
+    def per_day(self):
+        days = {}
+        for i in range((self.end - self.start).days + 1):
+            day = self.start + timedelta(days=i)
+            cache.clear()
+            days[day] = generate_time_slots(day)
+        return days
+
+    def test_range_matches_per_day_computation(self):
+        expected = self.per_day()
+        self.assertNotIn("09:00", [s["time"] for s in expected[self.start]])
+        self.assertEqual(expected[date(2030, 1, 14)], [])
+
+        cache.clear()
+        self.assertEqual(dict(iter_time_slots(self.start, self.end)), expected)
+        # Second pass is served from the cached occupancy
+        self.assertEqual(dict(iter_time_slots(self.start, self.end)), expected)
+
+    def test_range_endpoint_streams_every_day(self):
+        expected = self.per_day()
+
+        cache.clear()
+        response = self.client.get(
+            self.url, {"start": self.start.isoformat(), "end": self.end.isoformat()}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(b"".join(response.streaming_content)),
+            {day.isoformat(): slots for day, slots in expected.items()},
+        )
+
+    def test_range_is_capped(self):
+        end = self.start + timedelta(days=MAX_SLOT_RANGE_DAYS)
+        response = self.client.get(
+            self.url, {"start": self.start.isoformat(), "end": end.isoformat()}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+        end -= timedelta(days=1)
+        response = self.client.get(
+            self.url, {"start": self.start.isoformat(), "end": end.isoformat()}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        days = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(days), MAX_SLOT_RANGE_DAYS)
+
+
+@override_settings(BUSINESS_HOURS_BY_WEEKDAY=BUSINESS_HOURS)
+class SlotCacheTests(TestCase):
+    day = date(2030, 1, 7)
+
+    def setUp(self):
+        cache.clear()
+        self.appointment = make_appointment()
+
+    def times(self):
+        return [slot["time"] for slot in generate_time_slots(self.day)]
+
+    def test_accept_invalidates_cached_day(self):
+        self.assertIn("09:00", self.times())
+        self.assertIn(self.day, get_occupancy([self.day]))
+        version = ScheduleVersion.current()
+
+        self.appointment.accept_request()
+
+        self.assertGreater(ScheduleVersion.current(), version)
+        self.assertNotIn(self.day, get_occupancy([self.day]))
+        self.assertNotIn("09:00", self.times())
+
+    def test_bulk_accept_invalidates_cached_day(self):
+        self.assertIn("09:00", self.times())
+        version = ScheduleVersion.current()
+
+        Appointment.accept_many([self.appointment.pk])
+
+        self.assertGreater(ScheduleVersion.current(), version)
+        self.assertNotIn("09:00", self.times())
+
+
+class BulkDecisionTests(TestCase):
+    def setUp(self):
+        self.first = make_appointment()
+        self.overlapping = make_appointment(
+            requested_time=time(9, 30), end_time=time(10, 30)
+        )
+        self.afternoon = make_appointment(
+            requested_time=time(13, 0), end_time=time(14, 0)
+        )
+        self.booked = make_appointment(
+            requested_time=time(15, 0), end_time=time(16, 0), accepted="A"
+        )
+        self.late = make_appointment(
+            requested_time=time(15, 30), end_time=time(16, 30)
+        )
+        self.outside_batch = make_appointment(
+            requested_time=time(13, 30), end_time=time(14, 30)
+        )
+
+    def status(self, appointment):
+        appointment.refresh_from_db()
+        return appointment.accepted
+
+    def test_accept_many_declines_the_overlapping_requests(self):
+        accepted, declined = Appointment.accept_many([
+            self.first.pk, self.overlapping.pk, self.afternoon.pk, self.late.pk,
+        ])
+
+        self.assertEqual([a.pk for a in accepted], [self.first.pk, self.afternoon.pk])
+        self.assertEqual([a.pk for a in declined], [self.overlapping.pk, self.late.pk])
+        self.assertEqual(self.status(self.first), "A")
+        self.assertEqual(self.status(self.afternoon), "A")
+        self.assertEqual(self.status(self.overlapping), "D")
+        self.assertEqual(self.status(self.late), "D")
+        # Not in the batch, but overlaps a winner
+        self.assertEqual(self.status(self.outside_batch), "D")
+        self.assertEqual(self.status(self.booked), "A")
+
+    def test_decline_many(self):
+        declined = Appointment.decline_many([self.first.pk, self.booked.pk])
+
+        self.assertEqual({a.pk for a in declined}, {self.first.pk, self.booked.pk})
+        self.assertEqual(self.status(self.first), "D")
+        self.assertEqual(self.status(self.booked), "D")
+        self.assertEqual(self.status(self.overlapping), "P")
+
+    def test_bulk_action(self):
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", username="staff", password="pw", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(staff)
+        url = reverse("appointment-bulk")
+
+        response = client.post(url, {
+            "action": "accept",
+            "ids": [self.first.pk, self.overlapping.pk, self.booked.pk],
+        }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            "accepted": [self.first.pk],
+            "declined": [self.overlapping.pk],
+            "skipped": [self.booked.pk],
+        })
+
+        response = client.post(url, {"action": "decline", "ids": [self.afternoon.pk]}, format="json")
+
+        self.assertEqual(response.data["declined"], [self.afternoon.pk])
+        self.assertEqual(self.status(self.afternoon), "D")
+
+    def test_bulk_action_is_staff_only(self):
+        response = APIClient().post(
+            reverse("appointment-bulk"),
+            {"action": "accept", "ids": [self.first.pk]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.status(self.first), "P")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Three rows share a start, so pages split on the id tiebreaker
+        for hour in (9, 9, 9, 11):
+            make_appointment(
+                requested_time=time(hour, 0), end_time=time(hour + 1, 0)
+            )
+        make_appointment(requested_date=date(2030, 1, 6))
+        make_appointment(requested_date=date(2030, 1, 8), accepted="A")
+
+    def walk(self, url, inserts=()):
+        ids, inserts = [], list(inserts)
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+            if inserts:
+                make_appointment(**inserts.pop(0))
+        return ids
+
+    def expected(self, status):
+        return list(
+            Appointment.objects.filter(accepted=status)
+            .order_by("-requested_date", "-requested_time", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def test_pages_split_rows_with_equal_dates(self):
+        expected = self.expected("P")
+
+        self.assertEqual(self.walk(reverse("appointment-pending") + "?page_size=2"), expected)
+        self.assertEqual(self.walk(reverse("appointment-pending") + "?page_size=1"), expected)
+
+    def test_cursor_is_stable_across_inserts(self):
+        expected = self.expected("P")
+
+        ids = self.walk(
+            reverse("appointment-pending") + "?page_size=1",
+            inserts=[
+                # Sorts ahead of the served pages: never shown
+                {"requested_date": date(2030, 2, 1)},
+                # Ties the served key but has a larger id: never shown
+                {"requested_time": time(9, 0), "end_time": time(10, 0)},
+                # Sorts after the cursor: shown on a later page
+                {"requested_date": date(2030, 1, 5)},
+            ],
+        )
+
+        late = Appointment.objects.get(requested_date=date(2030, 1, 5))
+        self.assertEqual(ids, expected + [late.pk])
+
+    def test_accepted_list(self):
+        self.assertEqual(
+            self.walk(reverse("appointment-accepted") + "?page_size=1"),
+            self.expected("A"),
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("appointment-pending"), {"cursor": "nope"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BUSINESS_HOURS_BY_WEEKDAY=BUSINESS_HOURS)
+class SlotHoldTests(TestCase):
+    day = date(2030, 1, 8)
+
+    def setUp(self):
+        cache.clear()
+        self.mine = make_appointment(accepted="A")
+        self.theirs = make_appointment(customer_last_name="Other")
+
+    def reschedule(self, appointment, name, slot):
+        return self.client.post(
+            reverse(name, kwargs={"token": appointment.reschedule_token}),
+            {"date": self.day.isoformat(), "time": slot},
+            content_type="application/json",
+        )
+
+    def test_competing_holds_on_one_cell(self):
+        self.assertTrue(place_slot_hold(self.mine, self.day, time(13, 0)))
+        # Shares the 13:30 cell
+        self.assertFalse(place_slot_hold(self.theirs, self.day, time(12, 30)))
+
+        self.assertTrue(holds_slot(self.mine, self.day, time(13, 0)))
+        self.assertFalse(holds_slot(self.theirs, self.day, time(12, 30)))
+        slots = generate_time_slots(self.day, exclude_appointment_id=self.theirs.pk)
+        self.assertNotIn("13:00", [slot["time"] for slot in slots])
+
+        release_slot_hold(self.mine, self.day, time(13, 0))
+
+        self.assertTrue(place_slot_hold(self.theirs, self.day, time(12, 30)))
+
+    def test_new_hold_releases_the_previous_one(self):
+        place_slot_hold(self.mine, self.day, time(13, 0))
+        place_slot_hold(self.mine, self.day, time(15, 0))
+
+        self.assertFalse(holds_slot(self.mine, self.day, time(13, 0)))
+        self.assertTrue(place_slot_hold(self.theirs, self.day, time(13, 0)))
+
+    def test_hold_endpoint_rejects_a_held_slot(self):
+        response = self.reschedule(self.mine, "public-reschedule-hold", "13:00")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.reschedule(self.theirs, "public-reschedule-hold", "13:00")
+        self.assertEqual(response.status_code, 409)
+
+    def test_reschedule_into_held_slot(self):
+        self.reschedule(self.mine, "public-reschedule-hold", "13:00")
+
+        response = self.reschedule(self.mine, "public-reschedule", "13:00")
+
+        self.assertEqual(response.status_code, 200)
+        self.mine.refresh_from_db()
+        self.assertEqual(self.mine.requested_date, self.day)
+        self.assertEqual(self.mine.requested_time, time(13, 0))
+        self.assertEqual(self.mine.accepted, "P")
+        self.assertFalse(holds_slot(self.mine, self.day, time(13, 0)))
+
+    def test_expired_hold_is_rejected(self):
+        self.reschedule(self.mine, "public-reschedule-hold", "13:00")
+        # Hold keys expire on their own after SLOT_HOLD_TTL
+        cache.clear()
+
+        response = self.reschedule(self.mine, "public-reschedule", "13:00")
+
+        self.assertEqual(response.status_code, 409)
+        self.mine.refresh_from_db()
+        self.assertEqual(self.mine.requested_date, date(2030, 1, 7))
+        self.assertEqual(self.mine.accepted, "A")
+
+    def test_reschedule_without_hold_is_rejected(self):
+        response = self.reschedule(self.mine, "public-reschedule", "13:00")
+
+        self.assertEqual(response.status_code, 409)
+
+
+class ReminderClaimTests(TestCase):
+    start = datetime(2030, 1, 7, 0, 0)
+    end = datetime(2030, 1, 8, 0, 0)
+
+    def setUp(self):
+        self.due = [
+            make_appointment(accepted="A"),
+                make_appointment(
+                accepted="A", requested_time=time(14, 0), end_time=time(15, 0)
+            ),
+        ]
+        make_appointment()
+        make_appointment(accepted="A", requested_date=date(2030, 1, 8))
+
+    def test_claimed_once(self):
+        claimed = Appointment.claim_reminders(self.start, self.end)
+
+        self.assertEqual([a.pk for a in claimed], [a.pk for a in self.due])
+        self.assertEqual(Appointment.claim_reminders(self.start, self.end), [])
+
+    def test_claims_in_batches(self):
+        first = Appointment.claim_reminders(self.start, self.end, limit=1)
+        second = Appointment.claim_reminders(self.start, self.end, limit=1)
+
+        self.assertEqual([a.pk for a in first + second], [a.pk for a in self.due])
+
+    def test_moved_booking_is_reminded_again(self):
+        Appointment.claim_reminders(self.start, self.end)
+        moved = self.due[0]
+        moved.requested_time = time(11, 0)
+        moved.end_time = time(12, 0)
+        moved.save()
+
+        self.assertEqual(
+            [a.pk for a in Appointment.claim_reminders(self.start, self.end)], [moved.pk]
+        )
+
+    @mock.patch(
+        "appointments.management.commands.send_appointment_reminders.send_mobile_push_batch",
+        return_value=0,
+    )
+    def test_command_never_sends_twice(self, push):
+        # Reach the 2030 fixtures from today
+        hours = (self.end - datetime.now()).total_seconds() / 3600
+
+        call_command("send_appointment_reminders", hours=hours, stdout=mock.Mock())
+        call_command("send_appointment_reminders", hours=hours, stdout=mock.Mock())
+
+        self.assertEqual(OutboundEmail.objects.count(), len(self.due))
@@ -1,5 +1,7 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.conf import settings
+from django.db.models.functions import Lower
+from outbox.utils import enqueue_email, enqueue_messages
 
 def appointment_message(appointment):
     reschedule_url = (
@@ -20,7 +22,7 @@ Thank you,
 {settings.COMPANY_NAME}
 """
 
-def send_appointment_email(appointment, accepted=None):
+def build_appointment_email(appointment, accepted=None):
     if accepted:
         reschedule_url = (
             f"{settings.FRONTEND_URL}/reschedule/"
@@ -55,10 +57,98 @@ def send_appointment_email(appointment, accepted=None):
     {settings.DEFAULT_FROM_EMAIL}
     """
 
-    send_mail(
+    return EmailMessage(
         subject=f"Appointment {status}",
-        message=message,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[appointment.customer_email],
+    )
+
+def send_appointment_email(appointment, accepted=None):
+    enqueue_messages([build_appointment_email(appointment, accepted)])
+
+def send_reschedule_email(appointment, message):
+    enqueue_email(
+        subject="Appointment Rescheduled",
+        body=message,
+        to=[appointment.customer_email],
+    )
+
+def queue_appointment_emails(appointments, accepted=None):
+    """
+    Queue status emails for a batch with a single INSERT; the outbox
+    worker sends them once the surrounding transaction commits.
+    """
+    enqueue_messages(
+        build_appointment_email(appointment, accepted)
+        for appointment in appointments
+    )
+
+
+def reminder_text(appointment):
+    return (
+        f"Reminder: your appointment with {settings.COMPANY_NAME} is on "
+        f"{appointment.requested_date:%A, %B %d} at "
+        f"{appointment.requested_time.strftime('%I:%M %p')}."
+    )
+
+def build_reminder_email(appointment):
+    reschedule_url = (
+        f"{settings.FRONTEND_URL}/reschedule/"
+        f"{appointment.reschedule_token}"
+    )
+    message = f"""
+Hello {appointment.customer_first_name},
+
+{reminder_text(appointment)}
+
+📍 {appointment.customer_street_address}, {appointment.customer_city}
+
+Need to reschedule?
+{reschedule_url}
+
+Thank you,
+{settings.COMPANY_NAME}
+"""
+
+    return EmailMessage(
+        subject="Appointment reminder",
+        body=message,
         from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[appointment.customer_email],
-        fail_silently=False,
+        to=[appointment.customer_email],
     )
+
+def queue_reminder_emails(appointments):
+    enqueue_messages(
+        build_reminder_email(appointment)
+        for appointment in appointments
+    )
+
+def reminder_pushes(appointments):
+    """
+    (token, title, body, data) for every device registered by a user
+    whose email matches one of the appointments, found in one query.
+    """
+    from notifications.models import Device
+
+    by_email = {}
+    for appointment in appointments:
+        by_email.setdefault(appointment.customer_email.lower(), []).append(appointment)
+
+    devices = (
+        Device.objects
+        .annotate(email=Lower("user__email"))
+        .filter(email__in=list(by_email))
+        .values_list("token", "email")
+    )
+
+    return [
+        (
+            token,
+            "Appointment reminder",
+            reminder_text(appointment),
+            {"click_action": "/appointments", "appointment": appointment.pk},
+        )
+        for token, email in devices
+        for appointment in by_email[email]
+    ]
@@ -1,17 +1,70 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.db import transaction, IntegrityError
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseNotModified
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from handyman.streaming import streaming_response
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import json
 
 from .permissions import IsAdminOrReadCreateOnly
-from .models import Appointment
+from .pagination import AppointmentKeysetPagination
+from .models import Appointment, CalendarFeedToken, ScheduleVersion
 from .serializers import AppointmentSerializer, PublicAppointmentSerializer
-from .utils import send_appointment_email, send_mail
-from .scheduling import generate_time_slots
+from .utils import (
+    send_appointment_email,
+    send_reschedule_email,
+    queue_appointment_emails,
+)
+from .scheduling import (
+    generate_time_slots,
+    iter_time_slots,
+    MAX_SLOT_RANGE_DAYS,
+    APPOINTMENT_DURATION,
+    place_slot_hold,
+    holds_slot,
+    release_slot_hold,
+)
+from .cache import SLOT_HOLD_TTL
+from .calendar import iter_calendar
+
+# How far back the calendar feed reaches
+CALENDAR_FEED_HISTORY = timedelta(days=30)
+
+
+def _requested_slot(request):
+    """
+    Parse {"date": "YYYY-MM-DD", "time": "HH:MM"} from the body.
+    Returns (date, time, error_response).
+    """
+    new_date = request.data.get("date")
+    new_time = request.data.get("time")
+
+    if not new_date or not new_time:
+        return None, None, Response(
+            {"error": "date and time required"},
+            status=400
+        )
+
+    try:
+        new_date = datetime.strptime(new_date, "%Y-%m-%d").date()
+        new_time = datetime.strptime(new_time, "%H:%M").time()
+    except ValueError:
+        return None, None, Response(
+            {"error": "Invalid date or time format"},
+            status=400
+        )
+
+    return new_date, new_time, None
 
 
 @api_view(["GET", "POST"])
@@ -26,7 +79,8 @@ def public_reschedule(request, token):
     if request.method == "GET":
         slots = generate_time_slots(
             appointment.requested_date,
-            exclude_appointment_id=appointment.id
+            exclude_appointment_id=appointment.id,
+            duration=appointment.get_duration(),
         )
 
         return Response({
@@ -34,28 +88,15 @@ def public_reschedule(request, token):
             "available_slots": slots
         })
 
-    # POST → reschedule
-    new_date = request.data.get("date")
-    new_time = request.data.get("time")
+    # POST → reschedule into the slot this appointment holds
+    new_date, new_time, error = _requested_slot(request)
+    if error:
+        return error
 
-    if not new_date or not new_time:
-        return Response(
-            {"error": "date and time required"},
-            status=400
-        )
-
-    new_date = datetime.strptime(new_date, "%Y-%m-%d").date()
-    new_time = datetime.strptime(new_time, "%H:%M").time()
-
-    available = generate_time_slots(
-        new_date,
-        exclude_appointment_id=appointment.id
-    )
-
-    if new_time.strftime("%H:%M") not in [s["time"] for s in available]:
+    if not holds_slot(appointment, new_date, new_time):
         return Response(
-            {"error": "Selected time is no longer available"},
-            status=400
+            {"error": "Your hold on this time expired, please select it again"},
+            status=409
         )
 
     appointment.requested_date = new_date
@@ -63,9 +104,11 @@ def public_reschedule(request, token):
     appointment.accepted = "P"  # force re-approval
     appointment.save()
 
-    send_appointment_email(
-        subject="Appointment Rescheduled",
-        message=f"""
+    release_slot_hold(appointment, new_date, new_time)
+
+    send_reschedule_email(
+        appointment,
+        f"""
 Hello {appointment.customer_first_name},
 
 Your appointment has been rescheduled.
@@ -75,18 +118,92 @@ Your appointment has been rescheduled.
 
 We will notify you once it is confirmed.
 """,
-        recipient=appointment.customer_email
     )
 
     return Response({"status": "rescheduled"})
 
 
+@api_view(["POST"])
+def public_reschedule_hold(request, token):
+    """
+    Hold a slot for a few minutes while the customer confirms.
+    """
+    appointment = get_object_or_404(
+        Appointment,
+        reschedule_token=token,
+        accepted__in=["P", "A"]
+    )
+
+    new_date, new_time, error = _requested_slot(request)
+    if error:
+        return error
+
+    available = generate_time_slots(
+        new_date,
+        exclude_appointment_id=appointment.id,
+        duration=appointment.get_duration(),
+    )
+
+    if new_time.strftime("%H:%M") not in [s["time"] for s in available]:
+        return Response(
+            {"error": "Selected time is no longer available"},
+            status=409
+        )
+
+    if not place_slot_hold(appointment, new_date, new_time):
+        return Response(
+            {"error": "Selected time is being held by another customer"},
+            status=409
+        )
+
+    return Response({"status": "held", "expires_in": SLOT_HOLD_TTL})
+
+
+def appointments_calendar(request, key):
+    """
+    iCalendar feed of accepted appointments for calendar apps.
+
+    Authenticated by a feed-only key in the URL, since subscribing
+    clients cannot send headers. The ETag is the schedule version row,
+    so polls that find nothing changed get a 304 without reading any
+    appointments.
+    """
+    get_object_or_404(
+        CalendarFeedToken, key=key, user__is_staff=True, user__is_active=True
+    )
+
+    etag = f'"{ScheduleVersion.current()}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    appointments = (
+        Appointment.accepted_appointments()
+        .filter(requested_date__gte=timezone.localdate() - CALENDAR_FEED_HISTORY)
+        .order_by("requested_date", "requested_time", "id")
+        .iterator(chunk_size=500)
+    )
+    domain = urlparse(settings.FRONTEND_URL).hostname or "localhost"
+
+    response = streaming_response(
+        request,
+        iter_calendar(appointments, domain),
+        "text/calendar; charset=utf-8",
+    )
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    response["Content-Disposition"] = 'inline; filename="appointments.ics"'
+    return response
+
+
 class AppointmentViewSet(viewsets.ModelViewSet):
     queryset = Appointment.objects.all().order_by(
         "-requested_date", "-requested_time"
     )
     serializer_class = AppointmentSerializer
     permission_classes = [IsAdminOrReadCreateOnly]
+    pagination_class = AppointmentKeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -119,7 +236,12 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def accept(self, request, pk=None):
         appointment = self.get_object()
-        appointment.accept_request()
+
+        try:
+            appointment.accept_request()
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=409)
+
         send_appointment_email(appointment, accepted=True)
         serializer = self.get_serializer(appointment)
         return Response(serializer.data)
@@ -132,26 +254,92 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(appointment)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get", "post"], url_path="calendar-feed", permission_classes=[IsAdminUser])
+    def calendar_feed(self, request):
+        """
+        GET  → subscription URL for the requesting staff user's feed
+        POST → revoke the current URL and issue a new one
+        """
+        if request.method == "POST":
+            CalendarFeedToken.objects.filter(user=request.user).delete()
+        token, _ = CalendarFeedToken.objects.get_or_create(user=request.user)
+        url = reverse("appointments-calendar", kwargs={"key": token.key})
+        return Response({"url": request.build_absolute_uri(url)})
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """
+        POST /api/appointments/bulk/
+        {"action": "accept" | "decline", "ids": [1, 2, ...]}
+        """
+        bulk_action = request.data.get("action")
+        ids = request.data.get("ids")
+
+        if bulk_action not in ["accept", "decline"]:
+            return Response({"error": "action must be accept or decline"}, status=400)
+
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "ids must be a non-empty list"}, status=400)
+
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be integers"}, status=400)
+
+        if bulk_action == "accept":
+            try:
+                accepted, declined = Appointment.accept_many(ids)
+            except IntegrityError:
+                return Response(
+                    {"error": "A slot was booked concurrently, please retry"},
+                    status=409
+                )
+        else:
+            accepted, declined = [], Appointment.decline_many(ids)
+
+        queue_appointment_emails(accepted, accepted=True)
+        queue_appointment_emails(declined, accepted=False)
+
+        handled = {a.id for a in accepted} | {a.id for a in declined}
+
+        return Response({
+            "accepted": [a.id for a in accepted],
+            "declined": [a.id for a in declined],
+            "skipped": [pk for pk in ids if pk not in handled],
+        })
+
     @action(detail=False, methods=["get"])
     def pending(self, request):
-        appointments = Appointment.objects.filter(accepted="P")
-        serializer = self.get_serializer(appointments, many=True)
-        return Response(serializer.data)
+        return self._paginated(self.get_queryset().filter(accepted="P"))
 
     @action(detail=False, methods=["get"])
     def accepted(self, request):
-        appointments = Appointment.objects.filter(accepted="A")
-        serializer = self.get_serializer(appointments, many=True)
-        return Response(serializer.data)
+        return self._paginated(self.get_queryset().filter(accepted="A"))
+
+    def _paginated(self, queryset):
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=["get"], url_path="available-slots")
     def available_slots(self, request):
         """
         GET /api/appointments/available-slots/?date=YYYY-MM-DD&exclude=ID
+        GET /api/appointments/available-slots/?start=YYYY-MM-DD&end=YYYY-MM-DD
+
+        Both accept &duration=MINUTES (defaults to one hour).
         """
         date_str = request.query_params.get("date")
         exclude_id = request.query_params.get("exclude")
 
+        try:
+            duration = self._requested_duration(request)
+        except ValueError:
+            return Response({"error": "Invalid duration"}, status=400)
+
+        if not date_str and "start" in request.query_params:
+            return self._available_slots_range(request, exclude_id, duration)
+
         if not date_str:
             return Response({"error": "date is required"}, status=400)
 
@@ -162,10 +350,62 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
         slots = generate_time_slots(
             date,
-            exclude_appointment_id=exclude_id
+            exclude_appointment_id=exclude_id,
+            duration=duration,
         )
         return Response(slots)
 
+    def _requested_duration(self, request):
+        minutes = request.query_params.get("duration")
+        if not minutes:
+            return APPOINTMENT_DURATION
+
+        minutes = int(minutes)
+        if not 0 < minutes <= 24 * 60:
+            raise ValueError(minutes)
+        return timedelta(minutes=minutes)
+
+    def _available_slots_range(self, request, exclude_id, duration):
+        """
+        Stream {"YYYY-MM-DD": [slots], ...} for every day in the range.
+        """
+        start_str = request.query_params.get("start")
+        end_str = request.query_params.get("end")
+
+        if not start_str or not end_str:
+            return Response({"error": "start and end are required"}, status=400)
+
+        try:
+            start = datetime.strptime(start_str, "%Y-%m-%d").date()
+            end = datetime.strptime(end_str, "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"error": "Invalid date format"}, status=400)
+
+        if end < start:
+            return Response({"error": "end must not be before start"}, status=400)
+
+        if (end - start).days >= MAX_SLOT_RANGE_DAYS:
+            return Response(
+                {"error": f"Range cannot exceed {MAX_SLOT_RANGE_DAYS} days"},
+                status=400
+            )
+
+        def stream():
+            yield "{"
+            for i, (day, slots) in enumerate(
+                iter_time_slots(
+                    start,
+                    end,
+                    exclude_appointment_id=exclude_id,
+                    duration=duration,
+                )
+            ):
+                prefix = "," if i else ""
+                yield f"{prefix}{json.dumps(day.isoformat())}:{json.dumps(slots)}"
+            yield "}"
+
+        return streaming_response(request, stream(), "application/json")
+
     @action(detail=True, methods=["post"], url_path="reschedule")
     def reschedule(self, request, pk=None):
         """
@@ -193,7 +433,8 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
         available_slots = generate_time_slots(
             new_date,
-            exclude_appointment_id=appointment.id
+            exclude_appointment_id=appointment.id,
+            duration=appointment.get_duration(),
         )
 
         valid_times = {s["time"] for s in available_slots}
@@ -210,9 +451,9 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             appointment.accepted = "P"
             appointment.save()
 
-        send_mail(
-            subject="Appointment Rescheduled",
-            message=f"""
+        send_reschedule_email(
+            appointment,
+            f"""
 Hello {appointment.customer_first_name},
 
 🔄 Your appointment has been rescheduled.
@@ -222,8 +463,6 @@ Hello {appointment.customer_first_name},
 
 If you did not request this change, please contact us immediately.
 """,
-            from_email=settings.ADMIN_EMAIL,
-            recipient=appointment.customer_email,
         )
 
         return Response({
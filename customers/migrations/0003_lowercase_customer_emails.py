@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:32
+
+from django.db import migrations
+
+
+def lowercase_emails(apps, schema_editor):
+    Customer = apps.get_model("customers", "Customer")
+    taken = set(Customer.objects.values_list("email", flat=True))
+
+    for customer in Customer.objects.only("email"):
+        lowered = customer.email.lower()
+        if lowered == customer.email or lowered in taken:
+            # Already normalized, or a duplicate that needs merging by hand
+            continue
+        taken.discard(customer.email)
+        taken.add(lowered)
+        customer.email = lowered
+        customer.save(update_fields=["email"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
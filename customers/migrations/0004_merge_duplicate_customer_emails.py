@@ -0,0 +1,42 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:50
+
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+def merge_duplicate_emails(apps, schema_editor):
+    """
+    Merge customers whose emails differ only by case, which 0003 had to
+    leave mixed-case. Invoices move to the row already stored lowercase
+    (else the oldest one), the other rows are deleted and the survivor
+    is lowercased.
+    """
+    Customer = apps.get_model("customers", "Customer")
+    Invoice = apps.get_model("invoices", "Invoice")
+
+    groups = {}
+    for pk, email in Customer.objects.order_by("pk").values_list("pk", "email"):
+        groups.setdefault(email.lower(), []).append((pk, email))
+
+    for lowered, rows in groups.items():
+        if len(rows) == 1:
+            continue
+
+        keep = next((pk for pk, email in rows if email == lowered), rows[0][0])
+        duplicates = [pk for pk, _ in rows if pk != keep]
+
+        Invoice.objects.filter(customer_id__in=duplicates).update(customer_id=keep)
+        Customer.objects.filter(pk__in=duplicates).delete()
+        Customer.objects.filter(pk=keep).update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_lowercase_customer_emails'),
+        ('invoices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_emails, migrations.RunPython.noop),
+    ]
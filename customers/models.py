@@ -66,3 +66,9 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        # Stored lowercase so email lookups are exact matches on the unique index
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
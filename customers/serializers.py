@@ -5,4 +5,14 @@ class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
-        read_only_fields = []
\ No newline at end of file
+        read_only_fields = []
+
+    def validate_email(self, value):
+        # Stored lowercase, so uniqueness has to ignore case too
+        value = value.lower()
+        existing = Customer.objects.filter(email__iexact=value)
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError("customer with this email already exists.")
+        return value
@@ -1,3 +1,35 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Customer
+from .serializers import CustomerSerializer
+
+
+class CustomerSerializerTests(TestCase):
+    data = {
+        "first_name": "Bob",
+        "last_name": "Ray",
+        "street_address": "1 Main St",
+        "city": "Austin",
+    }
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="bob@x.com", **self.data)
+
+    def test_email_uniqueness_ignores_case(self):
+        serializer = CustomerSerializer(data={**self.data, "email": "Bob@X.com"})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("email", serializer.errors)
+
+    def test_email_is_stored_lowercase(self):
+        serializer = CustomerSerializer(data={**self.data, "email": "Ann@X.com"})
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().email, "ann@x.com")
+
+    def test_update_keeps_own_email(self):
+        serializer = CustomerSerializer(
+            self.customer, data={**self.data, "email": "BOB@x.com"}
+        )
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
@@ -1,8 +1,24 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, decorators
 from .models import Customer
 from .serializers import CustomerSerializer
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from handyman.exports import export_response
+
+# Exportable columns and the ORM path each one reads
+CUSTOMER_EXPORT_COLUMNS = {
+    "id": "id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "email": "email",
+    "phone_number": "phone_number",
+    "street_address": "street_address",
+    "apt_suite": "apt_suite",
+    "city": "city",
+    "state": "state",
+    "zip_code": "zip_code",
+    "created_at": "created_at",
+}
 
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
@@ -14,4 +30,19 @@ class CustomerViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_superuser:
             return Customer.objects.all()
-        return Customer.objects.none()
\ No newline at end of file
+        return Customer.objects.none()
+
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export_rows(self, request):
+        """
+        GET /api/customers/export/?output=csv|ndjson&columns=...&start=&end=
+        Streams customer rows filtered on the date they were created.
+        """
+        return export_response(
+            request, Customer.objects.all(), CUSTOMER_EXPORT_COLUMNS, "created_at__date", "customers"
+        )
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appointments.models import Appointment
+from customers.models import Customer
+
+
+class BenchCommand(BaseCommand):
+    """
+    Base for the bench_* management commands. bench() seeds synthetic
+    rows and times what it measures inside one transaction that is
+    always rolled back, so the database is left as it was found.
+    """
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            try:
+                self.bench(options)
+            finally:
+                transaction.set_rollback(True)
+
+    def bench(self, options):
+        raise NotImplementedError("subclasses of BenchCommand must provide a bench() method")
+
+    @staticmethod
+    def timed(fn, repeat, before=None):
+        """
+        Milliseconds each of ``repeat`` calls to ``fn`` took. ``before``
+        runs untimed ahead of every call, e.g. to drop a cache.
+        """
+        timings = []
+        for _ in range(repeat):
+            if before:
+                before()
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+
+def bench_customer(email, first_name="Bench", last_name="Mark"):
+    """Unsaved customer with a placeholder address."""
+    return Customer(
+        first_name=first_name,
+        last_name=last_name,
+        street_address="1 Main St",
+        city="Austin",
+        email=email,
+    )
+
+
+def bench_appointment(day, hour, accepted="A"):
+    """Unsaved one-hour appointment starting at ``hour`` on ``day``."""
+    return Appointment(
+        customer_first_name="Bench",
+        customer_last_name="Mark",
+        customer_email="bench@example.com",
+        customer_street_address="1 Main St",
+        customer_city="Austin",
+        requested_date=day,
+        requested_time=f"{hour:02d}:00",
+        end_time=f"{hour + 1:02d}:00",
+        accepted=accepted,
+    )
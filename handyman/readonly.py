@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import connection
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class WriteOnReadError(RuntimeError):
+    """A GET or HEAD handler tried to write to the database."""
+
+
+def _block_writes(execute, sql, params, many, context):
+    statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if statement in WRITE_STATEMENTS:
+        raise WriteOnReadError(f"Write during a read-only request: {sql[:200]}")
+    return execute(sql, params, many, context)
+
+
+class ReadOnlyGetMixin:
+    """
+    Viewset mixin that raises WriteOnReadError if a GET or HEAD handler
+    issues an INSERT, UPDATE or DELETE. Enabled by READ_ONLY_GET_GUARD.
+
+    Only the view itself is covered: middleware and the body of a
+    streaming response run outside the guard.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(settings, "READ_ONLY_GET_GUARD", False) and request.method in ("GET", "HEAD"):
+            with connection.execute_wrapper(_block_writes):
+                return super().dispatch(request, *args, **kwargs)
+
+        return super().dispatch(request, *args, **kwargs)
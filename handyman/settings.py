@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'appointments',
     'notifications.apps.NotificationsConfig',
     'reviews',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -79,6 +80,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not in-memory) test database so concurrency tests can
+        # open one connection per thread.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -180,6 +184,29 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache (slot occupancy, invalidations and reschedule holds). Every
+# worker must see the same entries, so outside DEBUG a CACHE_URL is required;
+# a per-process LocMemCache would let two workers hand out the same hold.
+CACHE_URL = os.getenv("CACHE_URL")
+
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif not DEBUG:
+    raise ImproperlyConfigured(
+        "CACHE_URL must point at a shared cache (e.g. Redis) when DEBUG is off"
+    )
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 def _parse_business_hours(value):
     try:
         raw = json.loads(value)
@@ -199,4 +226,10 @@ def _parse_business_hours(value):
 
 BUSINESS_HOURS_BY_WEEKDAY = _parse_business_hours(
     os.getenv("BUSINESS_HOURS_BY_WEEKDAY", "{}")
-)
\ No newline at end of file
+)
+# Pool processes per server rendering PDFs a client is waiting on; 0 renders
+# inline. Changed invoices are rendered ahead by `render_invoice_pdfs --loop`.
+INVOICE_PDF_WORKERS = int(os.getenv("INVOICE_PDF_WORKERS", "2"))
+
+# Raise on database writes from GET handlers of guarded viewsets; on in DEBUG.
+READ_ONLY_GET_GUARD = os.getenv("READ_ONLY_GET_GUARD", str(DEBUG).lower()) == "true"
@@ -0,0 +1,79 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Chunks pulled per hop to the sync thread when streaming under ASGI
+ASYNC_BATCH_SIZE = 200
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer
+    yields each formatted row instead of buffering it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def _next_batch(chunks, size):
+    return list(islice(chunks, size))
+
+
+async def aiter_chunks(chunks, batch_size=ASYNC_BATCH_SIZE):
+    """
+    Async iterator over a sync chunk iterator. Batches are pulled in the
+    request's sync thread, where the iterator's database cursor lives,
+    so the event loop is never blocked on a query.
+    """
+    chunks = iter(chunks)
+    next_batch = sync_to_async(_next_batch, thread_sensitive=True)
+    while batch := await next_batch(chunks, batch_size):
+        for chunk in batch:
+            yield chunk
+
+
+def streaming_response(request, chunks, content_type, filename=None):
+    """
+    StreamingHttpResponse over ``chunks`` that streams under both
+    handlers. Under ASGI Django consumes a sync iterator with list()
+    before sending anything, so it gets an async iterator instead.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        chunks = aiter_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def csv_response(request, header, rows, filename):
+    """
+    Stream ``rows`` (an iterable of sequences) as a CSV download.
+    """
+    return streaming_response(request, iter_csv(header, rows), "text/csv", filename)
+
+
+def ndjson_response(request, rows, filename):
+    """
+    Stream ``rows`` (an iterable of dicts) as newline-delimited JSON.
+    """
+    return streaming_response(request, iter_ndjson(rows), "application/x-ndjson", filename)
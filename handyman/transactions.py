@@ -0,0 +1,32 @@
+from django.db import transaction
+
+
+def on_commit_once(key, items, flush, using=None):
+    """
+    Collect ``items`` under ``key`` and call ``flush(items)`` once when
+    the current transaction commits, with everything collected for it.
+
+    Signal handlers use this so a transaction that saves many rows of
+    one invoice does the follow-up work for that invoice once. Outside
+    a transaction ``flush`` runs straight away, like on_commit.
+    """
+    connection = transaction.get_connection(using)
+    pending = connection.__dict__.setdefault("_on_commit_once", {})
+
+    batch = pending.get(key)
+    # A rollback discards the callback, and with it what it collected
+    if batch is not None and any(
+        callback is batch["callback"] for _, callback, _ in connection.run_on_commit
+    ):
+        batch["items"].update(items)
+        return
+
+    batch = pending[key] = {"items": set(items)}
+
+    def callback():
+        if pending.get(key) is batch:
+            del pending[key]
+        flush(batch["items"])
+
+    batch["callback"] = callback
+    transaction.on_commit(callback, using=using)
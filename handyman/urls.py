@@ -5,9 +5,9 @@ from rest_framework.routers import DefaultRouter
 from users.views import UserViewSet, verify_email, resend_verification_email
 from django.views.generic import TemplateView
 from msgs.views import MessageViewSet, AttachmentViewSet
-from invoices.views import InvoiceViewSet, PaymentViewSet, LaborViewSet, PartViewSet, CustomerInvoiceViewSet
+from invoices.views import InvoiceViewSet, PaymentViewSet, LaborViewSet, PartViewSet, CustomerInvoiceViewSet, ARAgingReportView
 from customers.views import CustomerViewSet
-from appointments.views import AppointmentViewSet, public_reschedule
+from appointments.views import AppointmentViewSet, public_reschedule, public_reschedule_hold, appointments_calendar
 from notifications.views import NotificationViewSet
 from reviews.views import GoogleReviewViewSet, ReviewStatsView
 from .views import DashboardView, CustomAuthToken
@@ -34,6 +34,16 @@ urlpatterns = [
         public_reschedule,
         name="public-reschedule"
     ),
+    path(
+        "appointments/reschedule/<uuid:token>/hold/",
+        public_reschedule_hold,
+        name="public-reschedule-hold"
+    ),
+    path(
+        "appointments/calendar/<str:key>.ics",
+        appointments_calendar,
+        name="appointments-calendar"
+    ),
     path(
         "api/users/verify-email/<uuid:token>/",
         verify_email,
@@ -46,6 +56,7 @@ urlpatterns = [
     ),
     path("api/dashboard/", DashboardView.as_view(), name="dashboard"),
     path("api/reviews/stats/", ReviewStatsView.as_view(), name="review-stats"),
+    path("api/reports/ar-aging/", ARAgingReportView.as_view(), name="ar-aging"),
     path('api/', include(router.urls)),
     re_path(r'^.*$', TemplateView.as_view(template_name='index.html'), name='react_app'),
 ]
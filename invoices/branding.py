@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class FileBackedCache:
+    """
+    A value built from a file, kept in memory and rebuilt when the
+    file's mtime or size changes. The file is stat'ed at most once
+    every ``check_interval`` seconds; get() returns None while it is
+    missing.
+    """
+
+    def __init__(self, path, loader, check_interval=5):
+        self._path = path
+        self._loader = loader
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._value = None
+        self._signature = None
+        self._checked_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self._check_interval:
+            return self._value
+
+        with self._lock:
+            path = self._path()
+            try:
+                stat = path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                signature = None
+
+            if signature != self._signature:
+                self._value = self._loader(path) if signature else None
+                self._signature = signature
+            self._checked_at = now
+
+        return self._value
+
+
+class LazyValue:
+    """
+    A value built on first use and then shared.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._value = None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
@@ -0,0 +1,120 @@
+import logging
+import zipfile
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Invoice
+from .pdf_cache import cached_invoice_pdf
+from .rendering import schedule_render
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipSink:
+    """
+    Write-only file object that buffers what zipfile writes until the
+    next drain(). It has no tell()/seek(), so zipfile streams entries
+    with data descriptors instead of seeking back.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Archive entry listing the invoices left out of an export
+ERRORS_ENTRY = "errors.txt"
+
+
+def _export_window():
+    return max(settings.INVOICE_PDF_WORKERS * 2, 1)
+
+
+def _read_pdf(invoice, job):
+    path = job.result() if job else None
+    if path:
+        try:
+            return Path(path).read_bytes()
+        except FileNotFoundError:
+            # Pruned by a newer render in the meantime
+            pass
+    return cached_invoice_pdf(invoice).read_bytes()
+
+
+def _collect(invoice, job):
+    try:
+        return invoice, _read_pdf(invoice, job), None
+    except Exception as e:
+        logger.exception("PDF render for invoice %s failed", invoice.invoice_number)
+        return invoice, None, e
+
+
+def iter_invoice_pdfs(invoices):
+    """
+    Yield (invoice, pdf bytes, error) in order; a failed render yields
+    None and the exception instead of stopping the batch. Renders run
+    in the PDF process pool with a bounded number in flight, so memory
+    does not grow with the number of invoices.
+    """
+    window = _export_window()
+    pending = deque()
+
+    for invoice in invoices:
+        pending.append((invoice, schedule_render(invoice.pk)))
+        if len(pending) >= window:
+            yield _collect(*pending.popleft())
+
+    while pending:
+        yield _collect(*pending.popleft())
+
+
+def iter_invoice_zip(invoices):
+    """
+    Yield a ZIP archive of the invoices' PDFs chunk by chunk, one entry
+    at a time. Invoices whose PDF failed to render are left out and
+    listed in an errors.txt entry at the end of the archive.
+    """
+    sink = _ZipSink()
+    errors = []
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for invoice, pdf, error in iter_invoice_pdfs(invoices):
+            if error is not None:
+                errors.append(f"invoice_{invoice.invoice_number}.pdf: {error}\n")
+                continue
+
+            info = zipfile.ZipInfo(
+                f"invoice_{invoice.invoice_number}.pdf",
+                date_time=invoice.issue_date.timetuple()[:6],
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, pdf)
+            yield sink.drain()
+
+        if errors:
+            archive.writestr(ERRORS_ENTRY, "".join(errors))
+
+    yield sink.drain()
+
+
+def invoices_issued_between(start, end):
+    return (
+        Invoice.objects
+        .filter(issue_date__range=(start, end))
+        .select_related("customer")
+        .order_by("issue_date", "invoice_number")
+        .iterator(chunk_size=200)
+    )
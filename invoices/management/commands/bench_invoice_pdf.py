@@ -0,0 +1,62 @@
+import statistics
+from decimal import Decimal
+
+from handyman.bench import BenchCommand, bench_customer
+from invoices.models import Invoice
+from invoices.pdf import generate_invoice_pdf, pdf_logo, pdf_styles
+
+
+class Command(BenchCommand):
+    help = "Report invoice PDF renders/sec with and without the shared style and logo cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=20,
+            help="Parts and labor lines on the synthetic invoice",
+        )
+        parser.add_argument(
+            "--renders",
+            type=int,
+            default=50,
+            help="Renders timed for each mode",
+        )
+
+    def bench(self, options):
+        customer = bench_customer("bench-invoice-pdf@example.com")
+        customer.save()
+        invoice = Invoice.objects.create(customer=customer)
+
+        half = options["lines"] // 2
+        invoice.apply_line_items(
+            parts=[
+                {"description": f"Part {i}", "quantity": 2, "unit_price": Decimal("12.99"), "position": i}
+                for i in range(half)
+            ],
+            labor=[
+                {"description": f"Labor {i}", "hours": Decimal("1.5"), "hourly_rate": Decimal("85"), "position": i}
+                for i in range(options["lines"] - half)
+            ],
+        )
+        invoice = Invoice.objects.select_related("customer").get(pk=invoice.pk)
+
+        self.stdout.write(f"logo: {'present' if pdf_logo.get() else 'missing'}")
+
+        def uncached():
+            # What every render used to pay: new styles, logo decoded from disk
+            pdf_styles.reset()
+            pdf_logo.reset()
+            generate_invoice_pdf(invoice)
+
+        def cached():
+            generate_invoice_pdf(invoice)
+
+        for label, render in (("per-render setup", uncached), ("shared cache", cached)):
+            render()
+            mean = statistics.mean(self.timed(render, options["renders"]))
+
+            self.stdout.write(
+                f"{label:<17} {1000 / mean:8.1f} renders/sec "
+                f"{mean:8.2f} ms/render"
+            )
@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+
+from customers.models import Customer
+from handyman.bench import BenchCommand, bench_customer
+from invoices.models import Invoice, Part, Labor
+from invoices.search import InvoiceSearch, fts_enabled, optimize_search_index, rebuild_search_index
+
+TRADE_WORDS = [
+    "replace", "repair", "install", "shingle", "gutter", "flashing", "drywall",
+    "faucet", "valve", "outlet", "breaker", "fence", "post", "deck", "stain",
+    "door", "hinge", "window", "screen", "caulk", "tile", "grout", "vanity",
+    "sink", "drain", "disposal", "heater", "thermostat", "fan", "fixture",
+]
+
+# One line in this many mentions the ridge vent
+RARE_PHRASE_EVERY = 1000
+
+# Whole emails and invoice numbers are index lookups and the rare phrase
+# ranks ~1k matches, all well inside the 10 ms budget at 1M lines. Words
+# on tens of thousands of invoices ("gutter", "replace", "thermo", the
+# "Benchley7" name prefix) are ranked with bm25() over every match, which
+# is linear in the match count: about 25-360 ms at 1M lines, so they are
+# reported over budget. Only a bounded candidate set would bring them in,
+# at the cost of best matches outside it never being found.
+QUERIES = [
+    "ridge vent",
+    "ridge ve",
+    "gutter",
+    "replace",
+    "thermo",
+    "Benchley7",
+    "bench7.benchley7@example.com",
+    "BS00012345",
+]
+
+LINES_PER_INVOICE = 5
+BATCH = 5000
+
+
+class Command(BenchCommand):
+    help = "Time invoice search over a seeded set of line items; fails over the latency budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=1_000_000, help="Line items to seed")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+        parser.add_argument("--budget-ms", type=float, default=10, help="Allowed median per query")
+
+    def bench(self, options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING("FTS5 index missing; timing the icontains fallback"))
+
+        slow = self._run(options)
+        if slow:
+            raise CommandError(f"Over {options['budget_ms']} ms: {', '.join(slow)}")
+        self.stdout.write(self.style.SUCCESS("All queries within budget"))
+
+    def _run(self, options):
+        rng = random.Random(0)
+        started = time.perf_counter()
+
+        customers = Customer.objects.bulk_create([
+            bench_customer(
+                f"bench{n}.benchley{n}@example.com",
+                first_name=f"Bench{n}",
+                last_name=f"Benchley{n}",
+            )
+            for n in range(2000)
+        ])
+        # Trade words with a long-tail frequency, plus a part number each
+        weights = [1 / rank for rank in range(1, len(TRADE_WORDS) + 1)]
+
+        invoice_count = max(options["lines"] // LINES_PER_INVOICE, 1)
+        for start in range(0, invoice_count, BATCH):
+            invoices = Invoice.objects.bulk_create([
+                Invoice(
+                    customer=customers[n % len(customers)],
+                    invoice_number=f"BS{n:08d}",
+                    amount=Decimal("0"),
+                    due_date=date.today(),
+                )
+                for n in range(start, min(start + BATCH, invoice_count))
+            ])
+            lines = [
+                (Part if n % 2 else Labor)(
+                    invoice=invoice,
+                    description=(
+                        "ridge vent"
+                        if rng.randrange(RARE_PHRASE_EVERY) == 0 else
+                        f"{rng.choices(TRADE_WORDS, weights)[0]} "
+                        f"{rng.choices(TRADE_WORDS, weights)[0]} part{rng.randrange(50_000)}"
+                    ),
+                    position=n,
+                    **(
+                        {"quantity": 1, "unit_price": Decimal("10")}
+                        if n % 2 else
+                        {"hours": Decimal("1"), "hourly_rate": Decimal("50")}
+                    ),
+                )
+                for invoice in invoices
+                for n in range(LINES_PER_INVOICE)
+            ]
+            Part.objects.bulk_create([line for line in lines if isinstance(line, Part)])
+            Labor.objects.bulk_create([line for line in lines if isinstance(line, Labor)])
+
+        # bulk_create skips the signals that keep the index current
+        rebuild_search_index()
+
+        self.stdout.write(
+            f"Seeded {invoice_count * LINES_PER_INVOICE} line items in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+        self.stdout.write("As written:")
+        self._time_queries(options)
+
+        started = time.perf_counter()
+        optimize_search_index()
+        self.stdout.write(f"After optimize_invoice_search ({time.perf_counter() - started:.1f}s):")
+        return self._time_queries(options)
+
+    def _time_queries(self, options):
+        slow = []
+        for query in QUERIES:
+            def search_page():
+                # What one page of the search action runs
+                search = InvoiceSearch(query)
+                search.count()
+                search.ids(0, 25)
+
+            median = statistics.median(self.timed(search_page, options["repeat"]))
+            hits = InvoiceSearch(query).count()
+            self.stdout.write(f"{query!r:32s} {hits:7d} hits {median:8.2f} ms")
+            if median > options["budget_ms"]:
+                slow.append(query)
+
+        return slow
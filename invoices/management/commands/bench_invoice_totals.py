@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from handyman.bench import BenchCommand, bench_customer
+from invoices.models import Invoice, Part, Labor
+
+
+def _python_recalculate(invoice):
+    """
+    The previous implementation: load every line and sum in Python.
+    """
+    parts_total = sum(part.total_price() for part in invoice.line_items.all())
+    labor_total = sum(labor.total_price() for labor in invoice.labor_items.all())
+
+    subtotal = parts_total + labor_total
+    tax = subtotal * (invoice.tax_rate / Decimal("100"))
+    return subtotal + tax - invoice.discount
+
+
+class Command(BenchCommand):
+    help = "Time entering invoices line by line with Python vs SQL totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            type=int,
+            nargs="+",
+            default=[10, 40, 200],
+            help="Line items per invoice (half parts, half labor)",
+        )
+
+    def bench(self, options):
+        customer = bench_customer("bench-invoice-totals@example.com")
+        customer.save()
+
+        for lines in options["lines"]:
+            for label, recalculate in (
+                ("python loop", _python_recalculate),
+                ("sql aggregate", Invoice.recalculate_amount),
+            ):
+                self._run(customer, lines, label, recalculate)
+
+    def _run(self, customer, lines, label, recalculate):
+        invoice = Invoice.objects.create(customer=customer)
+        invoice.refresh_from_db()
+        original = Invoice.recalculate_amount
+        Invoice.recalculate_amount = recalculate
+
+        def enter_lines():
+            for i in range(lines):
+                if i % 2:
+                    Labor.objects.create(
+                        invoice=invoice,
+                        description=f"Labor {i}",
+                        hours=Decimal("1.50"),
+                        hourly_rate=Decimal("85.00"),
+                        position=i,
+                    )
+                else:
+                    Part.objects.create(
+                        invoice=invoice,
+                        description=f"Part {i}",
+                        quantity=3,
+                        unit_price=Decimal("12.99"),
+                        position=i,
+                    )
+
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                [elapsed] = self.timed(enter_lines, 1)
+        finally:
+            Invoice.recalculate_amount = original
+
+        self.stdout.write(
+            f"{lines:5d} lines {label:<14} {elapsed:9.2f} ms "
+            f"{len(ctx.captured_queries):6d} queries"
+        )
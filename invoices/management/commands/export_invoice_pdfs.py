@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invoices.export import iter_invoice_zip, invoices_issued_between
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Write a ZIP of every invoice PDF issued in a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", type=_date, help="First issue date (YYYY-MM-DD)")
+        parser.add_argument("end", type=_date, help="Last issue date (YYYY-MM-DD)")
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="ZIP file to write (default invoices_<start>_<end>.zip)",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if end < start:
+            raise CommandError("end must not be before start")
+
+        output = options["output"] or f"invoices_{start}_{end}.zip"
+
+        written = 0
+        with open(output, "wb") as f:
+            for chunk in iter_invoice_zip(invoices_issued_between(start, end)):
+                f.write(chunk)
+                written += len(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written} bytes to {output}")
+        )
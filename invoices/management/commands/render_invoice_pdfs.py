@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from invoices.rendering import render_pending
+
+
+class Command(BaseCommand):
+    help = "Render the PDFs of invoices changed since their last render"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Invoices claimed per transaction",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for changed invoices",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        total_rendered = total_failed = 0
+
+        while True:
+            rendered, failed = render_pending(options["batch_size"])
+            total_rendered += rendered
+            total_failed += failed
+
+            if rendered or failed:
+                self.stdout.write(f"Rendered {rendered}, failed {failed}")
+                continue
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {total_rendered} rendered, {total_failed} failed")
+        )
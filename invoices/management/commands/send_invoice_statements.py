@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from invoices.models import Invoice
+from invoices.utils import send_invoice_statements
+
+
+class Command(BaseCommand):
+    help = "Queue an email of every unpaid invoice older than --days to its customer"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Minimum age of unpaid invoices, in days since issue",
+        )
+
+    def handle(self, *args, **options):
+        invoices = (
+            Invoice.objects
+            .unpaid_older_than(options["days"])
+            .select_related("customer")
+            .order_by("issue_date", "invoice_number")
+        )
+
+        queued = failed = 0
+        for result in send_invoice_statements(invoices):
+            line = f"{result['invoice']} -> {result['to'] or '-'}: {result['status']}"
+            if result["error"]:
+                line += f" ({result['error']})"
+
+            if result["status"] == "queued":
+                queued += 1
+                self.stdout.write(line)
+            else:
+                failed += result["status"] == "failed"
+                self.stderr.write(line)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {queued} queued, {failed} failed")
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_created_at'),
+        ('invoices', '0007_invoicenumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['issue_date'], name='invoice_issue_date_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:35
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_ledger(apps, schema_editor):
+    Invoice = apps.get_model("invoices", "Invoice")
+    Payment = apps.get_model("invoices", "Payment")
+
+    paid = (
+        Payment.objects
+        .filter(invoice=OuterRef("pk"))
+        .values("invoice")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    money = models.DecimalField(max_digits=10, decimal_places=2)
+
+    Invoice.objects.update(
+        amount_paid=Coalesce(Subquery(paid), Value(Decimal("0")), output_field=money)
+    )
+    Invoice.objects.update(
+        balance_due=Coalesce(F("amount"), Value(Decimal("0")), output_field=money) - F("amount_paid")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0008_invoice_issue_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='balance_due',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
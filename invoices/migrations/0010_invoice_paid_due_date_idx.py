@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_lowercase_customer_emails'),
+        ('invoices', '0009_invoice_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['paid', 'due_date'], name='invoice_paid_due_date_idx'),
+        ),
+    ]
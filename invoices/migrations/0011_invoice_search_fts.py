@@ -0,0 +1,65 @@
+# Full-text index over invoices for the search endpoint (SQLite FTS5 only)
+
+from django.db import migrations
+
+FTS_TABLE = "invoices_invoice_fts"
+
+# One document per invoice, rowid = invoice id. The prefix indexes keep
+# short typeahead prefixes from scanning every term.
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    invoice_number,
+    customer,
+    line_items,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# Initial documents; invoices.search keeps them current from signals
+BACKFILL = f"""
+INSERT INTO {FTS_TABLE} (rowid, invoice_number, customer, line_items)
+SELECT
+    i.id,
+    i.invoice_number,
+    c.first_name || ' ' || c.last_name || ' ' || c.email,
+    COALESCE((SELECT group_concat(p.description, ' ') FROM invoices_part p WHERE p.invoice_id = i.id), '')
+    || ' ' ||
+    COALESCE((SELECT group_concat(l.description, ' ') FROM invoices_labor l WHERE l.invoice_id = i.id), '')
+FROM invoices_invoice i
+JOIN customers_customer c ON c.id = i.customer_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends use the icontains fallback in invoices.search
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+
+    schema_editor.execute(CREATE_TABLE)
+    schema_editor.execute(BACKFILL)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0010_invoice_paid_due_date_idx'),
+        ('customers', '0003_lowercase_customer_emails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0011_invoice_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingInvoiceRender',
+            fields=[
+                ('invoice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='invoices.invoice')),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
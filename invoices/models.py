@@ -1,7 +1,27 @@
-from django.db import models, transaction
+from django.db import models, transaction, IntegrityError
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from decimal import Decimal
-from django.db.models import Sum
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models import Sum, F, DecimalField, Value, Case, When, Q
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+
+class InvoiceQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Everything InvoiceSerializer reads, in a fixed number of queries:
+        the customer joined and line items and payments prefetched.
+        """
+        return (
+            self.select_related("customer")
+            .prefetch_related("line_items", "labor_items", "payments")
+        )
+
+    def unpaid_older_than(self, days):
+        """Unpaid invoices issued at least ``days`` days ago."""
+        cutoff = timezone.localdate() - timedelta(days=days)
+        return self.filter(paid=False, issue_date__lte=cutoff)
+
 
 class Invoice(models.Model):
     invoice_number = models.CharField(
@@ -22,21 +42,49 @@ class Invoice(models.Model):
     tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=8.25)
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    # Payment ledger, kept current by Payment with F() updates
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    balance_due = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+
+    LEDGER_FIELDS = ("amount_paid", "balance_due")
+
+    objects = InvoiceQuerySet.as_manager()
+
     def __str__(self):
         return f"Invoice {self.invoice_number} - {self.customer}"
 
     def total_payments(self):
         return self.payments.aggregate(total=Sum("amount"))["total"] or 0
 
-    def balance_due(self):
-        return max(self.amount - self.total_payments(), 0)
+    @classmethod
+    def post_payment(cls, invoice_id, delta):
+        """
+        Add ``delta`` to the invoice's amount paid and set the paid flag
+        from the new balance, all in one UPDATE.
+        """
+        if not delta:
+            return
 
-    def update_payment_status(self):
-        """Automatically mark paid/unpaid depending on payment total."""
-        if self.total_payments() >= self.amount:
-            self.mark_as_paid()
-        else:
-            self.mark_as_unpaid()
+        cls.objects.filter(pk=invoice_id).update(
+            # paid first: MySQL evaluates SET left to right with new values
+            paid=cls._settled(F("amount_paid") + delta, F("amount")),
+            amount_paid=F("amount_paid") + delta,
+            balance_due=F("balance_due") - delta,
+        )
+
+    @staticmethod
+    def _settled(amount_paid, amount):
+        """
+        Paid flag expression: true once ``amount_paid`` covers a non-zero
+        ``amount``, so an invoice with no lines yet never reads as paid.
+        """
+        return Case(
+            When(
+                Q(GreaterThanOrEqual(amount_paid, amount), GreaterThan(amount, 0)),
+                then=Value(True),
+            ),
+            default=Value(False),
+        )
 
     def mark_as_paid(self):
         self.paid = True
@@ -52,6 +100,8 @@ class Invoice(models.Model):
         indexes = [
             models.Index(fields=['invoice_number']),
             models.Index(fields=['customer']),
+            models.Index(fields=['issue_date'], name='invoice_issue_date_idx'),
+            models.Index(fields=['paid', 'due_date'], name='invoice_paid_due_date_idx'),
         ]
     def days_until_due(self):
         from django.utils import timezone
@@ -66,36 +116,208 @@ class Invoice(models.Model):
         return timezone.now().date() > self.due_date and not self.paid
     
     def generate_invoice_number(self):
+        """
+        Next number for today: YYMMDD followed by the day's counter.
+        Call inside the transaction that saves the invoice, so a failed
+        insert gives the number back.
+        """
         today = timezone.now().date()
         prefix = today.strftime("%y%m%d")  # YYMMDD
 
-        with transaction.atomic():
-            count_today = (
-                Invoice.objects
-                .select_for_update()
-                .filter(issue_date=today)
-                .count()
-            )
-            return f"{prefix}{count_today + 1:03d}"
-        
+        return f"{prefix}{InvoiceNumberSequence.next_number(today):03d}"
+
     def recalculate_amount(self):
-        parts_total = sum(
-            part.total_price() for part in self.line_items.all()
+        """
+        Recompute the total from the line items and persist it.
+
+        Each line sum is one aggregate query over the invoice index and
+        the result is written with a single UPDATE, so the cost no longer
+        grows with the number of lines. The paid flag only moves when the
+        new total changes whether the payments cover it, so a flag set by
+        hand survives later edits. Returns the new amount.
+        """
+        money = DecimalField(max_digits=20, decimal_places=4)
+
+        parts_total = Part.objects.filter(invoice_id=self.pk).aggregate(
+            total=Sum(F("quantity") * F("unit_price"), output_field=money)
+        )["total"] or Decimal("0")
+        labor_total = Labor.objects.filter(invoice_id=self.pk).aggregate(
+            total=Sum(F("hours") * F("hourly_rate"), output_field=money)
+        )["total"] or Decimal("0")
+
+        # tax_rate is still the float field default on unsaved instances
+        tax_rate = Decimal(str(self.tax_rate))
+        subtotal = parts_total + labor_total
+        tax = subtotal * (tax_rate / Decimal("100"))
+        amount = (subtotal + tax - Decimal(str(self.discount))).quantize(
+            Decimal("0.01"), rounding=ROUND_HALF_UP
         )
-        labor_total = sum(
-            labor.total_price() for labor in self.labor_items.all()
+
+        fields = {}
+        if amount > 0:
+            # paid first: MySQL evaluates SET left to right with new values
+            fields["paid"] = Case(
+                # Same total: a flag set by hand or by the ledger stands
+                When(amount=amount, then=F("paid")),
+                When(GreaterThanOrEqual(F("amount_paid"), Value(amount)), then=Value(True)),
+                # Settled under the old total but short of the new one
+                When(amount__gt=0, amount__lte=F("amount_paid"), then=Value(False)),
+                default=F("paid"),
+            )
+
+        Invoice.objects.filter(pk=self.pk).update(
+            **fields,
+            amount=amount,
+            balance_due=amount - F("amount_paid"),
         )
+        self.amount = amount
+        return amount
 
-        subtotal = parts_total + labor_total
-        tax = subtotal * (self.tax_rate / Decimal("100"))
+    def apply_line_items(self, parts=(), labor=(), delete_parts=(), delete_labor=()):
+        """
+        Save many parts and labor rows in one transaction.
+
+        ``parts`` and ``labor`` are lists of field dicts; a dict with an
+        "id" updates that row of this invoice, any other is created.
+        Rows are written with bulk_create/bulk_update, so the amount,
+        the search document and the PDF are each refreshed once at the end.
+        """
+        # Imported here: the search module imports this one, and the
+        # rendering module loads ReportLab
+        from .rendering import queue_render
+        from .search import queue_index
+
+        with transaction.atomic():
+            self._apply_lines(
+                Part, parts, delete_parts,
+                ["description", "quantity", "unit_price", "position"],
+            )
+            self._apply_lines(
+                Labor, labor, delete_labor,
+                ["description", "hours", "hourly_rate", "position"],
+            )
+            self.recalculate_amount()
+            queue_index(self.pk)
+            queue_render(self.pk)
+
+    def _apply_lines(self, model, rows, delete_ids, fields):
+        lines = model.objects.filter(invoice_id=self.pk)
 
-        return subtotal + tax - self.discount
+        update_ids = {row["id"] for row in rows if row.get("id")}
+        existing = lines.in_bulk(update_ids | set(delete_ids))
+        unknown = (update_ids | set(delete_ids)) - set(existing)
+        if unknown:
+            raise ValidationError(
+                f"{model._meta.verbose_name_plural} {sorted(unknown)} "
+                f"do not belong to invoice {self.invoice_number}."
+            )
+
+        if delete_ids:
+            # Queryset delete skips the per-row recalculation in delete()
+            lines.filter(pk__in=delete_ids).delete()
+
+        created, updated = [], []
+        for row in rows:
+            values = {field: row[field] for field in fields if field in row}
+            if row.get("id"):
+                line = existing[row["id"]]
+                for field, value in values.items():
+                    setattr(line, field, value)
+                updated.append(line)
+            else:
+                created.append(model(invoice_id=self.pk, **values))
+
+        if updated:
+            model.objects.bulk_update(updated, fields)
+        if created:
+            model.objects.bulk_create(created)
 
     def save(self, *args, **kwargs):
-        # Custom save logic can be added here
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # Never write back ledger values read before a concurrent payment
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.LEDGER_FIELDS
+            ]
+
+        # The number allocated in pre_save commits or rolls back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class InvoiceNumberSequence(models.Model):
+    """
+    Per-day invoice counter. Allocation is a single atomic increment of
+    one row, so it does not scan invoices or depend on row locking.
+    """
+    day = models.DateField(primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)
 
-class Part(models.Model):
+    def __str__(self):
+        return f"{self.day}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, day):
+        with transaction.atomic():
+            if cls._increment(day):
+                return cls._current(day)
+            return cls._start_day(day)
+
+    @classmethod
+    def _increment(cls, day):
+        """
+        Bump the day's counter; returns whether the row existed.
+        """
+        return cls.objects.filter(day=day).update(
+            last_number=models.F("last_number") + 1
+        )
+
+    @classmethod
+    def _current(cls, day):
+        # The UPDATE holds the row lock until commit, so reading it
+        # back in the same transaction is still race-free
+        return cls.objects.filter(day=day).values_list(
+            "last_number", flat=True
+        ).get()
+
+    @classmethod
+    def _start_day(cls, day):
+        """
+        Create the day's row, continuing after any invoice already
+        numbered for that day. Returns the allocated number.
+        """
+        prefix = day.strftime("%y%m%d")
+        issued = Invoice.objects.filter(
+            invoice_number__startswith=prefix
+        ).values_list("invoice_number", flat=True)
+        highest = max(
+            (int(number[len(prefix):]) for number in issued if number[len(prefix):].isdigit()),
+            default=0,
+        )
+
+        try:
+            with transaction.atomic():
+                return cls.objects.create(day=day, last_number=highest + 1).last_number
+        except IntegrityError:
+            # Another allocation created it first
+            cls._increment(day)
+            return cls._current(day)
+
+class LineItem:
+    """
+    Remembers the invoice a line was loaded with, so the signals can
+    tell when a save moves it to another invoice without a query.
+    """
+    _loaded_invoice_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_invoice_id = instance.__dict__.get("invoice_id")
+        return instance
+
+class Part(LineItem, models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='line_items')
     description = models.CharField(max_length=255)
     quantity = models.IntegerField()
@@ -125,7 +347,7 @@ class Part(models.Model):
         super().save(*args, **kwargs)
         self.invoice.recalculate_amount()
 
-class Labor(models.Model):
+class Labor(LineItem, models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='labor_items')
     description = models.CharField(max_length=255)
     hours = models.DecimalField(max_digits=5, decimal_places=2)
@@ -155,12 +377,34 @@ class Labor(models.Model):
         super().save(*args, **kwargs)
         self.invoice.recalculate_amount()
 
+class PaymentQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the payments and take them off each invoice's ledger in
+        the same transaction. Cascades from a deleted invoice bypass
+        this, which is fine since the ledger goes with the invoice;
+        _raw_delete() and raw SQL bypass it too and must not be used.
+        """
+        with transaction.atomic():
+            totals = {}
+            for invoice_id, amount in self.select_for_update().values_list("invoice_id", "amount"):
+                totals[invoice_id] = totals.get(invoice_id, 0) + amount
+
+            result = super().delete()
+            for invoice_id, total in totals.items():
+                Invoice.post_payment(invoice_id, -total)
+
+        return result
+
+
 class Payment(models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='payments')
     payment_date = models.DateField()
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     method = models.CharField(max_length=50)
 
+    objects = PaymentQuerySet.as_manager()
+
     def __str__(self):
         return f"Payment of {self.amount} for Invoice {self.invoice.invoice_number}"
     
@@ -174,19 +418,52 @@ class Payment(models.Model):
         ]
     
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.apply_to_invoice()
+        amount = Decimal(str(self.amount))
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = (
+                    Payment.objects
+                    .select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("invoice_id", "amount")
+                    .first()
+                )
+
+            super().save(*args, **kwargs)
+
+            if previous is None:
+                Invoice.post_payment(self.invoice_id, amount)
+            elif previous[0] != self.invoice_id:
+                Invoice.post_payment(previous[0], -previous[1])
+                Invoice.post_payment(self.invoice_id, amount)
+            else:
+                Invoice.post_payment(self.invoice_id, amount - previous[1])
+
+        self._refresh_invoice()
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        self.apply_to_invoice()
+        with transaction.atomic():
+            # Reverse the stored row, not a possibly stale in-memory copy
+            stored = (
+                Payment.objects
+                .select_for_update()
+                .filter(pk=self.pk)
+                .values_list("invoice_id", "amount")
+                .first()
+            )
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                Invoice.post_payment(stored[0], -stored[1])
+
+        self._refresh_invoice()
+        return result
 
-    def apply_to_invoice(self):
-        if self.amount >= self.invoice.amount:
-            self.invoice.mark_as_paid()
-        else:
-            self.invoice.mark_as_unpaid()
-        self.invoice.save()
+    def _refresh_invoice(self):
+        # Keep an already-loaded invoice in step with the ledger
+        if Payment.invoice.is_cached(self):
+            self.invoice.refresh_from_db(fields=["paid", *Invoice.LEDGER_FIELDS])
 
     def refund(self):
         # Logic for refunding the payment
@@ -194,4 +471,18 @@ class Payment(models.Model):
 
     def outstanding_amount(self):
         return max(0, self.invoice.amount - self.amount)
-    
+
+
+class PendingInvoiceRender(models.Model):
+    """
+    Invoice whose cached PDF is out of date, waiting for the
+    render_invoice_pdfs worker. One row per invoice, so any number of
+    changes before the worker gets to it cost a single render.
+    """
+    invoice = models.OneToOneField(
+        Invoice, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Render invoice {self.invoice_id}"
@@ -12,8 +12,10 @@ from reportlab.platypus import (
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from django.conf import settings
+from pathlib import Path
 import os
 from dotenv import load_dotenv
+from .branding import FileBackedCache, LazyValue
 
 load_dotenv()
 
@@ -23,6 +25,57 @@ company_phone = os.getenv("REACT_APP_COMPANY_PHONE")
 company_address = os.getenv("REACT_APP_COMPANY_ADDRESS")
 company_citystate = os.getenv("REACT_APP_COMPANY_CITYSTATE")
 
+def _build_styles():
+    """
+    Paragraph and table styles shared by every render.
+    """
+    sheet = getSampleStyleSheet()
+
+    return {
+        "sheet": sheet,
+        "right_header": ParagraphStyle(
+            "RightHeader",
+            parent=sheet["Normal"],
+            alignment=2,  # RIGHT
+        ),
+        "header": TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+        ]),
+        "lines": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+            ("TOPPADDING", (0, 0), (-1, 0), 8),
+        ]),
+        "breakdown": TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.2, colors.white),
+            ("FONT", (0, 0), (-1, -2), "Helvetica"),
+            ("FONT", (0, -1), (-1, -1), "Helvetica-Bold"),
+            ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+            ("BACKGROUND", (0, -1), (-1, -1), colors.transparent),
+            ("TOPPADDING", (0, 0), (-1, -1), 1),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+        ]),
+        "payments": TableStyle([
+            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
+            ("TOPPADDING", (0, 0), (-1, -1), 6),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ]),
+    }
+
+# Built once per process; the logo is decoded once and reloaded when
+# the file changes
+pdf_styles = LazyValue(_build_styles)
+pdf_logo = FileBackedCache(
+    lambda: Path(settings.MEDIA_ROOT) / "branding" / "logo.png",
+    lambda path: Image(str(path), width=120, height=60, lazy=0),
+)
+
 def generate_invoice_pdf(invoice):
     buffer = BytesIO()
 
@@ -35,16 +88,14 @@ def generate_invoice_pdf(invoice):
         bottomMargin=36,
     )
 
-    styles = getSampleStyleSheet()
+    cached_styles = pdf_styles.get()
+    styles = cached_styles["sheet"]
     elements = []
 
     # =========================
     # HEADER (LEFT / RIGHT)
     # =========================
-    logo = ""
-    logo_path = os.path.join(settings.MEDIA_ROOT, "branding/logo.png")
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=120, height=60)
+    logo = pdf_logo.get() or ""
 
     left_header = Paragraph(
         f"<b>{company_name}</b><br/>"
@@ -62,11 +113,7 @@ def generate_invoice_pdf(invoice):
         {invoice.customer}<br/>
         {invoice.customer.email}<br/>    
         """,
-        ParagraphStyle(
-            "RightHeader",
-            parent=styles["Normal"],
-            alignment=2,  # RIGHT
-        ),
+        cached_styles["right_header"],
     )
 
     header_table = Table(
@@ -77,11 +124,7 @@ def generate_invoice_pdf(invoice):
         colWidths=[330, 200],
     )
 
-    header_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ALIGN", (1, 0), (1, 0), "RIGHT"),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-    ]))
+    header_table.setStyle(cached_styles["header"])
 
     elements.append(header_table)
     elements.append(Spacer(1, 20))
@@ -89,10 +132,10 @@ def generate_invoice_pdf(invoice):
     # =========================
     # PARTS
     # =========================
-    parts = invoice.line_items.all()
+    parts = list(invoice.line_items.all())
     parts_subtotal = Decimal("0.00")
 
-    if parts.exists():
+    if parts:
         elements.append(Paragraph("Parts", styles["Heading2"]))
 
         part_rows = [["Description", "Qty", "Unit Price", "Line Total"]]
@@ -115,10 +158,10 @@ def generate_invoice_pdf(invoice):
     # =========================
     # LABOR
     # =========================
-    labor_items = invoice.labor_items.all()
+    labor_items = list(invoice.labor_items.all())
     labor_subtotal = Decimal("0.00")
 
-    if labor_items.exists():
+    if labor_items:
         elements.append(Paragraph("Labor", styles["Heading2"]))
 
         labor_rows = [["Description", "Hours", "Rate", "Line Total"]]
@@ -166,25 +209,17 @@ def generate_invoice_pdf(invoice):
         hAlign="RIGHT",
     )
 
-    breakdown_table.setStyle(TableStyle([
-        ("GRID", (0, 0), (-1, -1), 0.2, colors.white),
-        ("FONT", (0, 0), (-1, -2), "Helvetica"),
-        ("FONT", (0, -1), (-1, -1), "Helvetica-Bold"),
-        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
-        ("BACKGROUND", (0, -1), (-1, -1), colors.transparent),
-        ("TOPPADDING", (0, 0), (-1, -1), 1),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
-    ]))
+    breakdown_table.setStyle(cached_styles["breakdown"])
 
     elements.append(breakdown_table)
 
     # =========================
     # PAYMENTS
     # =========================
-    payments = invoice.payments.all()
+    payments = list(invoice.payments.all())
     total_paid = Decimal("0.00")
 
-    if payments.exists():
+    if payments:
         elements.append(Spacer(1, 24))
         elements.append(Paragraph("Payments", styles["Heading2"]))
 
@@ -210,12 +245,7 @@ def generate_invoice_pdf(invoice):
             ],
         )
 
-        payment_table.setStyle(TableStyle([
-            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ]))
+        payment_table.setStyle(cached_styles["payments"])
 
         elements.append(payment_table)
         elements.append(Spacer(1, 10))
@@ -257,14 +287,7 @@ def _styled_table(data, doc):
         ],
     )
 
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-        ("TOPPADDING", (0, 0), (-1, 0), 8),
-    ]))
+    table.setStyle(pdf_styles.get()["lines"])
     return table
 
     return table
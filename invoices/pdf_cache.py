@@ -0,0 +1,130 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .pdf import (
+    generate_invoice_pdf,
+    company_name,
+    admin_email,
+    company_phone,
+    company_address,
+    company_citystate,
+)
+
+# Rendered PDFs live under MEDIA_ROOT/<PDF_CACHE_DIR>/<invoice id>/<fingerprint>.pdf
+PDF_CACHE_DIR = "invoice_pdfs"
+
+# Bump whenever generate_invoice_pdf changes its output
+PDF_LAYOUT_VERSION = 1
+
+
+def _cache_dir(invoice_id):
+    return Path(settings.MEDIA_ROOT) / PDF_CACHE_DIR / str(invoice_id)
+
+
+def _branding():
+    logo_path = Path(settings.MEDIA_ROOT) / "branding" / "logo.png"
+    try:
+        stat = logo_path.stat()
+        logo = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        logo = None
+
+    return (
+        company_name,
+        admin_email,
+        company_phone,
+        company_address,
+        company_citystate,
+        logo,
+    )
+
+
+def invoice_pdf_fingerprint(invoice):
+    """
+    Hash of everything the rendered PDF depends on: the invoice and
+    customer fields it prints, its line items and payments, and the
+    branding inputs.
+    """
+    payload = (
+        PDF_LAYOUT_VERSION,
+        invoice.invoice_number,
+        str(invoice.customer),
+        invoice.customer.email,
+        invoice.amount,
+        invoice.tax_rate,
+        invoice.discount,
+        list(invoice.line_items.values_list("description", "quantity", "unit_price")),
+        list(invoice.labor_items.values_list("description", "hours", "hourly_rate")),
+        list(invoice.payments.values_list("payment_date", "method", "amount")),
+        _branding(),
+    )
+    return hashlib.sha256(repr(payload).encode()).hexdigest()[:32]
+
+
+def cached_pdf_path(invoice, fingerprint=None):
+    fingerprint = fingerprint or invoice_pdf_fingerprint(invoice)
+    return _cache_dir(invoice.pk) / f"{fingerprint}.pdf"
+
+
+def store_invoice_pdf(path, pdf):
+    """
+    Atomically write ``pdf`` to ``path`` and drop older renders of the
+    same invoice.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    tmp.write_bytes(pdf)
+    os.replace(tmp, path)
+
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def cached_invoice_pdf(invoice):
+    """
+    Path of the rendered PDF for ``invoice``, rendering it on a miss.
+    """
+    path = cached_pdf_path(invoice)
+    if not path.exists():
+        store_invoice_pdf(path, generate_invoice_pdf(invoice))
+    return path
+
+
+def invalidate_invoice_pdf(invoice_id):
+    shutil.rmtree(_cache_dir(invoice_id), ignore_errors=True)
+
+
+def invoice_pdf_response(request, invoice, path):
+    """
+    Serve the cached PDF at ``path`` with ETag/Last-Modified, answering
+    matching conditional requests with 304.
+    """
+    etag = f'"{path.stem}"'
+    last_modified = int(path.stat().st_mtime)
+
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    response = FileResponse(open(path, "rb"), content_type="application/pdf")
+    response["Content-Disposition"] = (
+        f'inline; filename="invoice_{invoice.invoice_number}.pdf"'
+    )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
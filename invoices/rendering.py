@@ -0,0 +1,182 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from handyman.transactions import on_commit_once
+
+from .pdf import generate_invoice_pdf
+from .pdf_cache import cached_pdf_path, store_invoice_pdf
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_jobs = {}
+_lock = threading.RLock()
+
+
+def _render(invoice_id):
+    """
+    Render the invoice's current state into the PDF cache. Returns the
+    cached path, or None if the invoice was deleted.
+    """
+    from .models import Invoice
+
+    invoice = (
+        Invoice.objects
+        .select_related("customer")
+        .filter(pk=invoice_id)
+        .first()
+    )
+    if invoice is None:
+        return None
+
+    path = cached_pdf_path(invoice)
+    if not path.exists():
+        store_invoice_pdf(path, generate_invoice_pdf(invoice))
+    return str(path)
+
+
+def _render_job(invoice_id):
+    # Runs in a pool worker, which has no request cycle to recycle
+    # its database connection
+    close_old_connections()
+    try:
+        return _render(invoice_id)
+    finally:
+        close_old_connections()
+
+
+def _enqueue(invoice_ids):
+    from .models import Invoice, PendingInvoiceRender
+
+    existing = Invoice.objects.filter(pk__in=invoice_ids).values_list("pk", flat=True)
+    PendingInvoiceRender.objects.bulk_create(
+        [PendingInvoiceRender(invoice_id=pk) for pk in existing],
+        ignore_conflicts=True,
+    )
+
+
+def queue_render(*invoice_ids):
+    """
+    Queue the invoices for the render_invoice_pdfs worker once the
+    current transaction commits, so saving many rows of an invoice
+    queues it once and no request process renders anything.
+    """
+    on_commit_once(
+        "invoices.rendering",
+        [pk for pk in invoice_ids if pk is not None],
+        _enqueue,
+    )
+
+
+def render_pending(batch_size=50):
+    """
+    Render up to ``batch_size`` queued invoices in this process and
+    return (rendered, failed) counts.
+
+    Rows are claimed by deleting them before rendering, so a change
+    committed mid-render queues the invoice again, and concurrent
+    workers skip each other's rows.
+    """
+    from .models import PendingInvoiceRender
+
+    with transaction.atomic():
+        invoice_ids = list(
+            PendingInvoiceRender.objects
+            .select_for_update(skip_locked=True)
+            .order_by("queued_at")
+            .values_list("invoice_id", flat=True)[:batch_size]
+        )
+        PendingInvoiceRender.objects.filter(invoice_id__in=invoice_ids).delete()
+
+    rendered = failed = 0
+    for invoice_id in invoice_ids:
+        try:
+            _render(invoice_id)
+            rendered += 1
+        except Exception:
+            logger.exception("PDF render for invoice %s failed", invoice_id)
+            failed += 1
+
+    return rendered, failed
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        # spawn, not fork: forked children would share the parent's
+        # database connections
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.INVOICE_PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def _forget(invoice_id, job):
+    with _lock:
+        if _jobs.get(invoice_id) is job:
+            del _jobs[invoice_id]
+
+
+def schedule_render(invoice_id):
+    """
+    Queue a render of the invoice in the process pool and return its
+    Future, or None when INVOICE_PDF_WORKERS is 0. Only cache misses a
+    client is waiting on come here; changes are rendered ahead by the
+    render_invoice_pdfs worker, so the pool starts on first use.
+
+    A render still waiting in the queue already picks up the latest
+    state, so further requests for the same invoice reuse it.
+    """
+    global _executor
+
+    if not settings.INVOICE_PDF_WORKERS:
+        return None
+
+    with _lock:
+        job = _jobs.get(invoice_id)
+        if job is not None and not job.running() and not job.done():
+            return job
+
+        try:
+            job = _get_executor().submit(_render_job, invoice_id)
+        except (BrokenProcessPool, RuntimeError):
+            logger.warning("PDF render pool was broken; starting a new one")
+            _executor = None
+            job = _get_executor().submit(_render_job, invoice_id)
+
+        _jobs[invoice_id] = job
+        job.add_done_callback(lambda done: _forget(invoice_id, done))
+
+    return job
+
+
+def rendered_pdf_path(invoice, wait=0):
+    """
+    Path of the invoice's cached PDF. On a miss the render is queued
+    and awaited for up to ``wait`` seconds; returns None if it is still
+    running, so the caller can ask the client to poll.
+    """
+    path = cached_pdf_path(invoice)
+    if path.exists():
+        return path
+
+    job = schedule_render(invoice.pk)
+    if job is None:
+        store_invoice_pdf(path, generate_invoice_pdf(invoice))
+        return path
+
+    try:
+        job.result(timeout=wait)
+    except TimeoutError:
+        return None
+
+    return path if path.exists() else None
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import Invoice
+
+# (key, first day past due, last day past due); None is open-ended
+AGING_BUCKETS = [
+    ("current", None, 0),
+    ("days_1_30", 1, 30),
+    ("days_31_60", 31, 60),
+    ("days_61_90", 61, 90),
+    ("days_over_90", 91, None),
+]
+
+AGING_COLUMNS = [key for key, _, _ in AGING_BUCKETS] + ["total"]
+
+
+def _bucket_filter(as_of, first, last):
+    # Days past due = as_of - due_date, so the bounds become due_date bounds
+    q = Q()
+    if first is not None:
+        q &= Q(due_date__lte=as_of - timedelta(days=first))
+    if last is not None:
+        q &= Q(due_date__gte=as_of - timedelta(days=last))
+    if first is None:
+        # Invoices without a due date are not yet past due
+        q |= Q(due_date__isnull=True)
+    return q
+
+
+def ar_aging(as_of):
+    """
+    Open balances per customer split into aging buckets as of ``as_of``,
+    computed with conditional aggregation in a single grouped query over
+    unpaid invoices.
+    """
+    zero = Decimal("0")
+    buckets = {
+        key: Sum("balance_due", filter=_bucket_filter(as_of, first, last), default=zero)
+        for key, first, last in AGING_BUCKETS
+    }
+
+    return (
+        Invoice.objects
+        .filter(paid=False, balance_due__gt=0)
+        .values(
+            "customer_id",
+            "customer__first_name",
+            "customer__last_name",
+            "customer__email",
+        )
+        .annotate(
+            invoices=Count("id"),
+            total=Sum("balance_due", default=zero),
+            **buckets,
+        )
+        .order_by("customer__last_name", "customer__first_name", "customer_id")
+    )
+
+
+def aging_totals(rows):
+    totals = dict.fromkeys(AGING_COLUMNS, Decimal("0"))
+    for row in rows:
+        for key in AGING_COLUMNS:
+            totals[key] += row[key]
+    return totals
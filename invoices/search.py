@@ -0,0 +1,232 @@
+import re
+from functools import cached_property
+
+from django.db import connection
+from django.db.models import Q
+from handyman.transactions import on_commit_once
+
+from .models import Invoice
+
+# Created by migration 0011 on SQLite builds with FTS5
+FTS_TABLE = "invoices_invoice_fts"
+
+# Column weights for bm25(): invoice_number, customer, line_items
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+_fts_enabled = None
+
+
+def fts_enabled():
+    global _fts_enabled
+
+    if _fts_enabled is None:
+        _fts_enabled = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_enabled
+
+
+def _insert_documents(where, params):
+    """Write the documents of the invoices matched by ``where``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE} (rowid, invoice_number, customer, line_items)
+            SELECT
+                i.id,
+                i.invoice_number,
+                c.first_name || ' ' || c.last_name || ' ' || c.email,
+                COALESCE((SELECT group_concat(p.description, ' ') FROM invoices_part p WHERE p.invoice_id = i.id), '')
+                || ' ' ||
+                COALESCE((SELECT group_concat(l.description, ' ') FROM invoices_labor l WHERE l.invoice_id = i.id), '')
+            FROM invoices_invoice i
+            JOIN customers_customer c ON c.id = i.customer_id
+            WHERE {where}
+            """,
+            params,
+        )
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def index_invoices(*invoice_ids):
+    """
+    Rebuild the search documents of the given invoices now. Ids of
+    deleted invoices just drop out of the index.
+    """
+    invoice_ids = [pk for pk in invoice_ids if pk is not None]
+    if fts_enabled() and invoice_ids:
+        placeholders = _placeholders(invoice_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", invoice_ids
+            )
+        _insert_documents(f"i.id IN ({placeholders})", invoice_ids)
+
+
+def index_customer_invoices(*customer_ids):
+    """Rebuild the documents of every invoice of the given customers now."""
+    if fts_enabled() and customer_ids:
+        where = f"i.customer_id IN ({_placeholders(customer_ids)})"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"(SELECT i.id FROM invoices_invoice i WHERE {where})",
+                list(customer_ids),
+            )
+        _insert_documents(where, list(customer_ids))
+
+
+def queue_index(*invoice_ids):
+    """
+    Reindex the given invoices once the current transaction commits.
+    The signals in invoices.signals call this on every save and delete,
+    and each invoice is reindexed once however many of its rows the
+    transaction wrote. Bulk writes that skip signals must call it
+    themselves.
+    """
+    on_commit_once(
+        "invoices.search",
+        [pk for pk in invoice_ids if pk is not None],
+        lambda ids: index_invoices(*ids),
+    )
+
+
+def queue_customer_index(customer_id):
+    on_commit_once(
+        "invoices.search.customers",
+        [customer_id],
+        lambda ids: index_customer_invoices(*ids),
+    )
+
+
+def rebuild_search_index():
+    """Rebuild every document, e.g. after loading rows in bulk."""
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        _insert_documents("1 = 1", [])
+
+
+def optimize_search_index():
+    """
+    Merge the FTS5 index into one segment. Every line item change
+    rewrites its invoice's document, so the index fragments over time
+    and common words get slower to rank until it is merged.
+    """
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def _match_expression(words):
+    # Quote each word so user input can't inject FTS5 query syntax. The
+    # last word matches as a prefix, as it may still be being typed.
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class InvoiceSearch:
+    """
+    Invoices matching ``text`` in their number, customer name or email,
+    or line item descriptions, best first. Sliceable and countable, so
+    it pages like a queryset.
+
+    A whole invoice number or customer email is looked up on its btree
+    index. Anything else is ranked with bm25() over every FTS5 match,
+    which costs time in proportion to the number of matches, or matched
+    with icontains lookups newest first where the index is missing.
+    """
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self.words = [word.lower() for word in re.findall(r"\w+", self.text)]
+
+    def count(self):
+        if not self.words:
+            return 0
+
+        if self._exact is not None:
+            return self._exact.count()
+
+        if fts_enabled():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                    [_match_expression(self.words)],
+                )
+                return cursor.fetchone()[0]
+
+        return self._fallback().count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("InvoiceSearch only supports slicing")
+
+        start = index.start or 0
+        ids = self.ids(start, index.stop - start)
+        invoices = Invoice.objects.with_related().in_bulk(ids)
+        return [invoices[pk] for pk in ids if pk in invoices]
+
+    def ids(self, offset, limit):
+        if not self.words or limit <= 0:
+            return []
+
+        if self._exact is not None:
+            return list(self._exact[offset:offset + limit])
+
+        if fts_enabled():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                    f"ORDER BY bm25({FTS_TABLE}, %s, %s, %s), rowid DESC "
+                    f"LIMIT %s OFFSET %s",
+                    [_match_expression(self.words), *FTS_WEIGHTS, limit, offset],
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+        return list(self._fallback()[offset:offset + limit])
+
+    @cached_property
+    def _exact(self):
+        """
+        Ids of the invoices whose number or customer email is exactly
+        ``text``, or None when there are none.
+        """
+        if "@" in self.text:
+            lookup = Q(customer__email=self.text.lower())
+        elif self.text and " " not in self.text:
+            lookup = Q(invoice_number=self.text)
+        else:
+            return None
+
+        matches = (
+            Invoice.objects.filter(lookup)
+            .order_by("-issue_date", "-id")
+            .values_list("id", flat=True)
+        )
+        return matches if matches.exists() else None
+
+    def _fallback(self):
+        text = self.text
+        return (
+            Invoice.objects
+            .filter(
+                Q(invoice_number__icontains=text)
+                | Q(customer__first_name__icontains=text)
+                | Q(customer__last_name__icontains=text)
+                | Q(customer__email__icontains=text)
+                | Q(line_items__description__icontains=text)
+                | Q(labor_items__description__icontains=text)
+            )
+            .order_by("-issue_date", "-id")
+            .values_list("id", flat=True)
+            .distinct()
+        )
@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from .models import Invoice, Part, Labor, Payment, models
-from decimal import Decimal
+from .models import Invoice, Part, Labor, Payment
+from decimal import Decimal, ROUND_HALF_UP
 
 class PartSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField()
@@ -40,8 +40,40 @@ class LaborSerializer(serializers.ModelSerializer):
     def get_total_price(self, obj):
         return obj.total_price()
     
+class PartItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Part
+        fields = ["id", "description", "quantity", "unit_price", "position"]
+
+class LaborItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Labor
+        fields = ["id", "description", "hours", "hourly_rate", "position"]
+
+class LineItemsSerializer(serializers.Serializer):
+    """
+    Payload for saving an invoice's parts and labor in one request.
+    """
+    parts = PartItemSerializer(many=True, required=False)
+    labor = LaborItemSerializer(many=True, required=False)
+    delete_parts = serializers.ListField(child=serializers.IntegerField(), required=False)
+    delete_labor = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+class StatementBatchSerializer(serializers.Serializer):
+    """
+    Which invoices to email: explicit ids, or every unpaid invoice
+    issued at least ``older_than_days`` days ago.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    older_than_days = serializers.IntegerField(min_value=0, default=30)
+
 class PaymentSerializer(serializers.ModelSerializer):
     invoice = serializers.PrimaryKeyRelatedField(queryset=Invoice.objects.all())
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, rounding=ROUND_HALF_UP)
 
     class Meta:
         model = Payment
@@ -85,11 +117,10 @@ class InvoiceSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_payments(self, obj):
-        total = obj.payments.aggregate(total=models.Sum("amount"))["total"] or 0
-        return Decimal(total).quantize(Decimal("0.00"))
+        return Decimal(obj.amount_paid).quantize(Decimal("0.00"))
 
     def get_balance_due(self, obj):
-        return Decimal(max(obj.amount - self.get_total_payments(obj), 0)).quantize(Decimal("0.00"))
+        return Decimal(max(obj.balance_due, 0)).quantize(Decimal("0.00"))
 
     def get_days_until_due(self, obj):
         return obj.days_until_due() if obj.due_date else None
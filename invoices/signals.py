@@ -1,10 +1,14 @@
 from django.db import transaction
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
-from .models import Invoice
+from customers.models import Customer
+from .models import Invoice, Part, Labor, Payment
+from .pdf_cache import invalidate_invoice_pdf
+from .rendering import queue_render
+from .search import queue_index, queue_customer_index
 
 @receiver(pre_save, sender=Invoice)
 def set_invoice_defaults(sender, instance: Invoice, **kwargs):
@@ -12,24 +16,7 @@ def set_invoice_defaults(sender, instance: Invoice, **kwargs):
         return
 
     today = timezone.now().date()
-    prefix = today.strftime("%y%m%d")
-
-    with transaction.atomic():
-        last_invoice = (
-            Invoice.objects
-            .select_for_update()
-            .filter(issue_date=today)
-            .order_by("-invoice_number")
-            .first()
-        )
-
-        if last_invoice:
-            last_num = int(last_invoice.invoice_number[-3:])
-            next_num = last_num + 1
-        else:
-            next_num = 1
-
-        instance.invoice_number = f"{prefix}{next_num:03d}"
+    instance.invoice_number = instance.generate_invoice_number()
 
     instance.amount = Decimal("0.00")
     instance.due_date = today + timedelta(days=3)
@@ -44,6 +31,54 @@ def update_invoice_amount(sender, instance: Invoice, created, update_fields=None
         if not {"tax_rate", "discount"} & set(update_fields):
             return
 
-    amount = instance.recalculate_amount()
+    instance.recalculate_amount()
+
+# The cache key changes with the content, so stale renders are never
+# served; rendering the new state ahead makes the next view a file send
+# and prunes the old file.
+
+@receiver(post_save, sender=Invoice)
+def prerender_invoice_pdf(sender, instance, **kwargs):
+    queue_render(instance.pk)
+
+@receiver(post_save, sender=Part)
+@receiver(post_delete, sender=Part)
+@receiver(post_save, sender=Labor)
+@receiver(post_delete, sender=Labor)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def prerender_invoice_pdf_on_line_change(sender, instance, **kwargs):
+    queue_render(instance.invoice_id)
+
+@receiver(post_delete, sender=Invoice)
+def drop_invoice_pdf(sender, instance, **kwargs):
+    invoice_id = instance.pk
+    transaction.on_commit(lambda: invalidate_invoice_pdf(invoice_id))
 
-    Invoice.objects.filter(pk=instance.pk).update(amount=amount)
\ No newline at end of file
+# Search index upkeep. Kept in signals rather than database triggers so
+# migrations that rebuild these tables on SQLite are unaffected.
+
+@receiver(post_save, sender=Invoice)
+def index_invoice(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"invoice_number", "customer"} & set(update_fields):
+        queue_index(instance.pk)
+
+@receiver(post_delete, sender=Invoice)
+def unindex_deleted_invoice(sender, instance, **kwargs):
+    queue_index(instance.pk)
+
+@receiver(post_save, sender=Part)
+@receiver(post_delete, sender=Part)
+@receiver(post_save, sender=Labor)
+@receiver(post_delete, sender=Labor)
+def index_line_invoice(sender, instance, **kwargs):
+    # A line moved to another invoice changes both documents
+    queue_index(instance.invoice_id, instance._loaded_invoice_id)
+    instance._loaded_invoice_id = instance.invoice_id
+
+@receiver(post_save, sender=Customer)
+def index_customer(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or {"first_name", "last_name", "email"} & set(update_fields):
+        queue_customer_index(instance.pk)
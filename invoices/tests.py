@@ -1,3 +1,553 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+import zipfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from customers.models import Customer
+from handyman.readonly import WRITE_STATEMENTS, ReadOnlyGetMixin, WriteOnReadError
+from handyman.urls import router
+from outbox.models import OutboundEmail
+from users.models import CustomUser
+
+from .export import ERRORS_ENTRY, iter_invoice_zip
+from .models import (
+    Invoice,
+    InvoiceNumberSequence,
+    Labor,
+    Part,
+    Payment,
+    PendingInvoiceRender,
+)
+from .pdf_cache import cached_pdf_path
+from .rendering import render_pending
+from .search import InvoiceSearch, fts_enabled
+from .utils import send_invoice_statements
+from .views import (
+    CustomerInvoiceViewSet,
+    InvoiceViewSet,
+    LaborViewSet,
+    PartViewSet,
+    PaymentViewSet,
+)
+
+
+def make_customer(email="pat@example.com"):
+    return Customer.objects.create(
+        first_name="Pat",
+        last_name="Lee",
+        street_address="1 Main St",
+        city="Austin",
+        email=email,
+    )
+
+
+def make_invoice(customer, unit_price="10.00"):
+    invoice = Invoice.objects.create(customer=customer)
+    Part.objects.create(
+        invoice=invoice,
+        description="Hinge",
+        quantity=1,
+        unit_price=Decimal(unit_price),
+    )
+    invoice.refresh_from_db()
+    return invoice
+
+
+class InvoiceZipExportTests(TestCase):
+    def test_failed_render_is_listed_instead_of_truncating(self):
+        customer = make_customer()
+        good, bad = make_invoice(customer), make_invoice(customer)
+
+        def read_pdf(invoice, job):
+            if invoice.pk == bad.pk:
+                raise RuntimeError("render crashed")
+            return b"%PDF-1.4"
+
+        with mock.patch("invoices.export.schedule_render", return_value=None), \
+                mock.patch("invoices.export._read_pdf", side_effect=read_pdf), \
+                self.assertLogs("invoices.export", "ERROR"):
+            data = b"".join(iter_invoice_zip(Invoice.objects.order_by("pk")))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [f"invoice_{good.invoice_number}.pdf", ERRORS_ENTRY],
+            )
+            errors = archive.read(ERRORS_ENTRY).decode()
+
+        self.assertIn(f"invoice_{bad.invoice_number}.pdf: render crashed", errors)
+
+
+class InvoiceNumberSequenceTests(TransactionTestCase):
+    workers = 8
+    per_worker = 10
+
+    def setUp(self):
+        # Every thread needs its own connection to the same database
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database")
+
+    def test_parallel_allocation_is_unique_and_gap_free(self):
+        day = date(2030, 1, 7)
+        barrier = threading.Barrier(self.workers)
+        numbers, errors = [], []
+        lock = threading.Lock()
+
+        def allocate():
+            allocated = []
+            try:
+                barrier.wait()
+                for _ in range(self.per_worker):
+                    allocated.append(InvoiceNumberSequence.next_number(day))
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+            finally:
+                connection.close()
+
+            with lock:
+                numbers.extend(allocated)
+
+        threads = [threading.Thread(target=allocate) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(numbers), list(range(1, self.workers * self.per_worker + 1))
+        )
+
+
+class InvoiceListQueryTests(TestCase):
+    # More rows than the default page, so a per-row query would show
+    rows = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="pw"
+        )
+        customer = make_customer()
+        invoices = Invoice.objects.bulk_create([
+            Invoice(customer=customer, invoice_number=f"LIST{i:04d}", due_date=date(2030, 1, 7))
+            for i in range(cls.rows)
+        ])
+        Part.objects.bulk_create([
+            Part(invoice=invoice, description="Hinge", quantity=2, unit_price=Decimal("12.50"))
+            for invoice in invoices
+        ])
+        Labor.objects.bulk_create([
+            Labor(invoice=invoice, description="Install", hours=Decimal("1.5"), hourly_rate=Decimal("85"))
+            for invoice in invoices
+        ])
+        Payment.objects.bulk_create([
+            Payment(invoice=invoice, payment_date=date(2030, 1, 7), amount=Decimal("5.00"), method="cash")
+            for invoice in invoices
+        ])
+
+    def list_invoices(self, page_size):
+        request = APIRequestFactory().get("/api/invoices/", {"page_size": page_size})
+        force_authenticate(request, user=self.admin)
+        response = InvoiceViewSet.as_view({"get": "list"})(request)
+        response.render()
+        return response
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # count, page of invoices with customers, then one prefetch each
+        # for parts, labor and payments
+        with self.assertNumQueries(5):
+            response = self.list_invoices(page_size=self.rows)
+
+        self.assertEqual(len(response.data["results"]), self.rows)
+
+        with self.assertNumQueries(5):
+            self.list_invoices(page_size=5)
+
+
+class InvoiceStatementTests(TestCase):
+    def test_render_failure_is_reported_and_the_batch_continues(self):
+        customer = make_customer()
+        bad, good = make_invoice(customer), make_invoice(customer)
+
+        def read_pdf(invoice, job):
+            if invoice.pk == bad.pk:
+                raise RuntimeError("render crashed")
+            return b"%PDF-1.4"
+
+        with mock.patch("invoices.export.schedule_render", return_value=None), \
+                mock.patch("invoices.export._read_pdf", side_effect=read_pdf), \
+                self.assertLogs("invoices.export", "ERROR"):
+            results = send_invoice_statements(Invoice.objects.order_by("pk"))
+
+        self.assertEqual(
+            [(r["invoice"], r["status"]) for r in results],
+            [(bad.invoice_number, "failed"), (good.invoice_number, "queued")],
+        )
+        self.assertEqual(
+            list(OutboundEmail.objects.values_list("invoice", flat=True)), [good.pk]
+        )
+
+
+class PaymentLedgerTests(TestCase):
+    def setUp(self):
+        self.invoice = make_invoice(make_customer())
+
+    def pay(self, amount, invoice=None):
+        return Payment.objects.create(
+            invoice=invoice or self.invoice,
+            payment_date=date(2030, 1, 7),
+            amount=Decimal(amount),
+            method="cash",
+        )
+
+    def test_new_line_item_reopens_a_paid_invoice(self):
+        self.pay(self.invoice.amount)
+        self.invoice.refresh_from_db()
+        self.assertTrue(self.invoice.paid)
+
+        Part.objects.create(
+            invoice=self.invoice, description="Latch", quantity=1, unit_price=Decimal("50.00")
+        )
+        self.invoice.refresh_from_db()
+
+        self.assertFalse(self.invoice.paid)
+        self.assertEqual(self.invoice.balance_due, Decimal("54.12"))
+
+    def test_empty_invoice_is_not_paid(self):
+        invoice = Invoice.objects.create(customer=self.invoice.customer)
+        invoice.save()
+        invoice.refresh_from_db()
+
+        self.assertEqual(invoice.amount, Decimal("0.00"))
+        self.assertFalse(invoice.paid)
+
+    def test_manual_paid_flag_survives_edits(self):
+        self.invoice.paid = True
+        self.invoice.save(update_fields=["paid"])
+
+        self.invoice.save()
+        Part.objects.create(
+            invoice=self.invoice, description="Latch", quantity=1, unit_price=Decimal("50.00")
+        )
+        self.invoice.refresh_from_db()
+
+        self.assertTrue(self.invoice.paid)
+        self.assertEqual(self.invoice.amount_paid, Decimal("0.00"))
+
+    def test_delete_reverses_the_stored_amount(self):
+        payment = self.pay("5.00")
+        stale = Payment.objects.get(pk=payment.pk)
+        payment.amount = Decimal("2.00")
+        payment.save()
+
+        stale.delete()
+        self.invoice.refresh_from_db()
+
+        self.assertEqual(self.invoice.amount_paid, Decimal("0.00"))
+        self.assertEqual(self.invoice.balance_due, self.invoice.amount)
+
+    def test_queryset_delete_updates_the_ledger(self):
+        other = make_invoice(self.invoice.customer)
+        self.pay("3.00")
+        self.pay("4.00")
+        self.pay("5.00", invoice=other)
+
+        Payment.objects.filter(invoice__customer=self.invoice.customer).delete()
+
+        for invoice in (self.invoice, other):
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.amount_paid, Decimal("0.00"))
+            self.assertEqual(invoice.balance_due, invoice.amount)
+
+
+class PdfRenderQueueTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def test_changes_queue_one_render_per_invoice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = make_invoice(make_customer())
+            for i in range(3):
+                Part.objects.create(
+                    invoice=invoice, description=f"Shim {i}", quantity=1, unit_price=1
+                )
+            Payment.objects.create(
+                invoice=invoice,
+                payment_date=date(2030, 1, 7),
+                amount=Decimal("1.00"),
+                method="cash",
+            )
+
+        self.assertEqual(
+            list(PendingInvoiceRender.objects.values_list("invoice", flat=True)), [invoice.pk]
+        )
+
+    def test_worker_renders_and_clears_the_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = make_invoice(make_customer())
+
+        with mock.patch("invoices.rendering.generate_invoice_pdf", return_value=b"%PDF-") as render:
+            self.assertEqual(render_pending(), (1, 0))
+            self.assertEqual(render_pending(), (0, 0))
+
+        render.assert_called_once()
+        self.assertFalse(PendingInvoiceRender.objects.exists())
+        self.assertEqual(cached_pdf_path(invoice).read_bytes(), b"%PDF-")
+
+    def test_failed_render_is_dropped_from_the_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_invoice(make_customer())
+
+        with mock.patch("invoices.rendering.generate_invoice_pdf", side_effect=ValueError), \
+                self.assertLogs("invoices.rendering", "ERROR"):
+            self.assertEqual(render_pending(), (0, 1))
+
+        self.assertFalse(PendingInvoiceRender.objects.exists())
+
+
+class WritingView(ReadOnlyGetMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        make_customer(email="written@example.com")
+        return Response({})
+
+
+@override_settings(READ_ONLY_GET_GUARD=True, INVOICE_PDF_WORKERS=0)
+class ReadOnlyGetTests(TestCase):
+    # GET routes of invoices.views: (url kwargs, query params)
+    routes = {
+        "invoice-list": ({}, {}),
+        "invoice-detail": ({"pk": "invoice"}, {}),
+        "invoice-pdf": ({"pk": "invoice"}, {}),
+        "invoice-export-pdfs": ({}, {"start": "2000-01-01", "end": "2100-01-01"}),
+        "invoice-export-rows": ({}, {"output": "csv"}),
+        "invoice-search": ({}, {"q": "hinge"}),
+        "payment-list": ({}, {}),
+        "payment-detail": ({"pk": "payment"}, {}),
+        "payment-export-rows": ({}, {"output": "ndjson"}),
+        "part-list": ({}, {}),
+        "part-detail": ({"pk": "part"}, {}),
+        "labor-list": ({}, {}),
+        "labor-detail": ({"pk": "labor"}, {}),
+        "customer-invoice-list": ({}, {}),
+        "customer-invoice-detail": ({"pk": "invoice"}, {}),
+        "ar-aging": ({}, {}),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="pw"
+        )
+        invoice = make_invoice(make_customer())
+        cls.objects = {
+            "invoice": invoice,
+            "part": invoice.line_items.get(),
+            "labor": Labor.objects.create(
+                invoice=invoice, description="Fitting", hours=Decimal("1.5"), hourly_rate=Decimal("40.00")
+            ),
+            # Three decimal places, which the serializer used to round on read
+            "payment": Payment.objects.create(
+                invoice=invoice,
+                payment_date=date(2030, 1, 7),
+                amount=Decimal("5.005"),
+                method="cash",
+            ),
+        }
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def test_every_get_route_is_covered(self):
+        views = {
+            InvoiceViewSet, PaymentViewSet, PartViewSet, LaborViewSet, CustomerInvoiceViewSet,
+        }
+        names = {
+            pattern.name for pattern in router.urls
+            if getattr(pattern.callback, "cls", None) in views
+            and "get" in pattern.callback.actions
+        }
+
+        self.assertEqual(names | {"ar-aging"}, set(self.routes))
+
+    def test_gets_do_not_write(self):
+        for name, (kwargs, params) in self.routes.items():
+            kwargs = {key: self.objects[value].pk for key, value in kwargs.items()}
+            url = reverse(name, kwargs=kwargs)
+            # Called without the middleware, which runs outside the guard
+            request = APIRequestFactory().get(url, params)
+            force_authenticate(request, user=self.admin)
+
+            with self.subTest(name), CaptureQueriesContext(connection) as ctx:
+                response = resolve(url).func(request, **kwargs)
+                if hasattr(response, "render"):
+                    response.render()
+                # Streamed bodies run after the view, outside the guard
+                b"".join(getattr(response, "streaming_content", []))
+
+                self.assertEqual(response.status_code, 200)
+                writes = [
+                    query["sql"] for query in ctx.captured_queries
+                    if query["sql"].lstrip().upper().startswith(WRITE_STATEMENTS)
+                ]
+                self.assertEqual(writes, [])
+
+    def test_guard_raises_on_write(self):
+        request = APIRequestFactory().get("/")
+
+        with self.assertRaises(WriteOnReadError), transaction.atomic():
+            WritingView.as_view()(request)
+
+        self.assertFalse(Customer.objects.filter(email="written@example.com").exists())
+
+        with override_settings(READ_ONLY_GET_GUARD=False):
+            self.assertEqual(WritingView.as_view()(request).status_code, 200)
+
+
+class ExportStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="pw"
+        )
+        cls.token = Token.objects.create(user=admin)
+        for _ in range(3):
+            make_invoice(make_customer(email=f"c{Invoice.objects.count()}@example.com"))
+
+    async def test_exports_stream_asynchronously_under_asgi(self):
+        response = await self.async_client.get(
+            "/api/invoices/export/",
+            {"output": "ndjson"},
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b"".join(lines).splitlines()), 3)
+
+    def test_exports_stream_synchronously_under_wsgi(self):
+        response = self.client.get(
+            "/api/invoices/export/",
+            {"output": "csv"},
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 4)
+
+
+class InvoiceSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@example.com", username="admin", password="pw"
+        )
+        cls.customer = make_customer()
+
+    def search(self, text):
+        return [invoice.pk for invoice in InvoiceSearch(text)[0:100]]
+
+    def test_index_follows_line_items_customers_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = make_invoice(self.customer)
+        part = invoice.line_items.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            part.description = "Ridge vent"
+            part.save()
+        self.assertEqual(self.search("ridge"), [invoice.pk])
+        self.assertEqual(self.search("hinge"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.apply_line_items(labor=[{"description": "Gutter guard", "hours": 1, "hourly_rate": 50}])
+        self.assertEqual(self.search("gutter"), [invoice.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.last_name = "Okafor"
+            self.customer.save()
+        self.assertEqual(self.search("okafor"), [invoice.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.delete()
+        self.assertEqual(self.search("ridge"), [])
+
+    def test_whole_number_or_email_is_an_exact_lookup(self):
+        other = make_customer(email="sam@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = make_invoice(self.customer), make_invoice(self.customer)
+            make_invoice(other)
+
+        self.assertEqual(self.search("PAT@example.com"), [second.pk, first.pk])
+        self.assertEqual(self.search(first.invoice_number), [first.pk])
+        self.assertEqual(InvoiceSearch("pat@example.com").count(), 2)
+        # A partial email still goes through the word search
+        self.assertEqual(len(self.search("sam@exam")), 1)
+
+    def test_moved_line_reindexes_both_invoices(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            source, target = make_invoice(self.customer), make_invoice(self.customer)
+        part = source.line_items.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            part.description = "Ridge vent"
+            part.invoice = target
+            part.save()
+
+        self.assertEqual(self.search("ridge"), [target.pk])
+        self.assertEqual(self.search("hinge"), [target.pk])
+
+    def test_reindexes_each_invoice_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = make_invoice(self.customer)
+
+        with mock.patch("invoices.search.index_invoices") as index_invoices:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(5):
+                    Part.objects.create(
+                        invoice=invoice, description=f"Shim {i}", quantity=1, unit_price=1
+                    )
+
+        index_invoices.assert_called_once_with(invoice.pk)
+
+    def test_ranks_every_match_and_pages(self):
+        if not fts_enabled():
+            self.skipTest("needs the SQLite FTS5 index")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoices = [make_invoice(self.customer) for _ in range(30)]
+            # A number match outweighs a line item match on a newer invoice
+            target = invoices[0]
+            Part.objects.create(
+                invoice=invoices[-1], description=target.invoice_number, quantity=1, unit_price=1
+            )
+
+        self.assertEqual(InvoiceSearch(target.invoice_number).ids(0, 1), [target.pk])
+
+        request = APIRequestFactory().get("/", {"q": "hinge", "page": 2, "page_size": 20})
+        force_authenticate(request, user=self.admin)
+        response = InvoiceViewSet.as_view({"get": "search"})(request)
+
+        self.assertEqual(response.data["count"], 30)
+        self.assertEqual(len(response.data["results"]), 10)
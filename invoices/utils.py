@@ -1,60 +1,141 @@
-from .pdf import generate_invoice_pdf
+import logging
+from .pdf_cache import cached_invoice_pdf
 from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
 from email.mime.image import MIMEImage
 from pathlib import Path
+from outbox.utils import enqueue_email
+from .branding import FileBackedCache
+from .export import iter_invoice_pdfs
 
-def send_invoice_email(invoice, to_email):
-    try:
-        pdf_file = generate_invoice_pdf(invoice)
+logger = logging.getLogger(__name__)
 
-        subject = f"Invoice #{invoice.invoice_number}"
+# Banner bytes stay in memory and are re-read only when the file changes
+email_banner = FileBackedCache(
+    lambda: Path(settings.BASE_DIR) / "staticfiles" / "media" / "rrr_banner_white.png",
+    lambda path: path.read_bytes(),
+)
 
-        text_body = (
-            f"Dear {invoice.customer},\n"
-            f"Please find attached invoice #{invoice.invoice_number}.\n\n"
-            f"Thank you for your business!"
-        )
+def invoice_email_content(invoice):
+    """
+    Return (subject, text_body, html_body) for an invoice email.
+    """
+    subject = f"Invoice #{invoice.invoice_number}"
 
-        html_body = f"""
-        <html>
-          <body style="font-family: Arial, sans-serif;">
-            <img src="cid:banner_logo" style="max-width:600px;" />
-            <p>Dear {invoice.customer},<br/>
-            Please find attached invoice <strong>#{invoice.invoice_number}</strong>.</p>
-            <p>Thank you for your business!</p>
-          </body>
-        </html>
-        """
-
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[to_email],
-        )
+    text_body = (
+        f"Dear {invoice.customer},\n"
+        f"Please find attached invoice #{invoice.invoice_number}.\n\n"
+        f"Thank you for your business!"
+    )
 
-        email.attach_alternative(html_body, "text/html")
+    html_body = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif;">
+        <img src="cid:banner_logo" style="max-width:600px;" />
+        <p>Dear {invoice.customer},<br/>
+        Please find attached invoice <strong>#{invoice.invoice_number}</strong>.</p>
+        <p>Thank you for your business!</p>
+      </body>
+    </html>
+    """
 
-        # Attach PDF
-        email.attach(
-            f"invoice_{invoice.invoice_number}.pdf",
-            pdf_file,
-            "application/pdf",
-        )
+    return subject, text_body, html_body
+
+def attach_invoice_files(email, invoice):
+    """
+    Attach the invoice PDF and the inline banner logo to ``email``.
+    """
+    email.attach(
+        f"invoice_{invoice.invoice_number}.pdf",
+        cached_invoice_pdf(invoice).read_bytes(),
+        "application/pdf",
+    )
+
+    banner = email_banner.get()
+    if banner is None:
+        raise FileNotFoundError("Email banner rrr_banner_white.png is missing")
+
+    logo = MIMEImage(banner)
+    logo.add_header("Content-ID", "<banner_logo>")
+    logo.add_header("Content-Disposition", "inline", filename="rrr_banner_white.png")
+    email.attach(logo)
+
+def build_invoice_email(invoice, to_email, connection=None):
+    subject, text_body, html_body = invoice_email_content(invoice)
 
-        # Attach logo inline
-        logo_path = Path(settings.BASE_DIR) / "staticfiles" / "media" / "rrr_banner_white.png"
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[to_email],
+        connection=connection,
+    )
+    email.attach_alternative(html_body, "text/html")
+    attach_invoice_files(email, invoice)
+    return email
 
-        with open(logo_path, "rb") as f:
-            logo = MIMEImage(f.read())
-            logo.add_header("Content-ID", "<banner_logo>")
-            logo.add_header("Content-Disposition", "inline", filename="rrr_banner_white.png")
-            email.attach(logo)
+def _statement_result(invoice, status, error=""):
+    return {
+        "invoice": invoice.invoice_number,
+        "to": invoice.customer.email,
+        "status": status,
+        "error": error,
+    }
 
-        email.send(fail_silently=False)
+def send_invoice_statements(invoices):
+    """
+    Queue each invoice's email in the outbox for the send_outbox worker,
+    which delivers a batch over one mail connection.
+
+    PDFs are rendered first in the PDF process pool, a few invoices
+    ahead, so the worker finds them cached; an invoice whose PDF fails
+    is reported and the rest carry on. Returns one result dict per
+    invoice with a status of "queued", "skipped" or "failed".
+    """
+    results = []
+    for invoice, _pdf, error in iter_invoice_pdfs(invoices):
+        if error is not None:
+            results.append(_statement_result(invoice, "failed", str(error)))
+            continue
+
+        to_email = invoice.customer.email
+        if not to_email:
+            results.append(_statement_result(invoice, "skipped", "Customer has no email"))
+            continue
+
+        subject, text_body, html_body = invoice_email_content(invoice)
+        try:
+            enqueue_email(
+                subject=subject,
+                body=text_body,
+                to=[to_email],
+                html_body=html_body,
+                invoice=invoice,
+            )
+        except Exception as e:
+            logger.warning("Statement for invoice %s failed: %s", invoice.invoice_number, e)
+            results.append(_statement_result(invoice, "failed", str(e)))
+        else:
+            results.append(_statement_result(invoice, "queued"))
+
+    return results
+
+def send_invoice_email(invoice, to_email):
+    """
+    Queue the invoice email; the PDF is rendered by the outbox worker.
+    """
+    try:
+        subject, text_body, html_body = invoice_email_content(invoice)
+
+        enqueue_email(
+            subject=subject,
+            body=text_body,
+            to=[to_email],
+            html_body=html_body,
+            invoice=invoice,
+        )
 
-        return f"Email sent to {to_email} successfully."
+        return f"Email to {to_email} queued for delivery."
 
     except Exception as e:
-        return f"Failed to send email to {to_email}. Error: {str(e)}"
+        return f"Failed to queue email to {to_email}. Error: {str(e)}"
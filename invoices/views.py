@@ -1,18 +1,32 @@
 from rest_framework import viewsets, permissions, decorators, response
 from rest_framework.authentication import TokenAuthentication
-from django.http import HttpResponse
-from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, Http404
+from datetime import datetime
+from django.core.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
-from decimal import Decimal, ROUND_HALF_UP
+from rest_framework.views import APIView
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
+from django.utils import timezone
+from handyman.readonly import ReadOnlyGetMixin
+from handyman.exports import export_response
+from handyman.streaming import csv_response, streaming_response
 from notifications.models import Notification
-from .pdf import generate_invoice_pdf
-from .utils import send_invoice_email
+from .pdf_cache import invoice_pdf_response
+from .rendering import rendered_pdf_path
+from .export import iter_invoice_zip, invoices_issued_between
+from .pagination import InvoicePagination
+from .reports import AGING_COLUMNS, ar_aging, aging_totals
+from .search import InvoiceSearch
+from .utils import send_invoice_email, send_invoice_statements
 from .models import Invoice, Part, Labor, Payment
 from .serializers import (
     InvoiceSerializer,
     PartSerializer,
     LaborSerializer,
     PaymentSerializer,
+    LineItemsSerializer,
+    StatementBatchSerializer,
 )
 
 def create_invoice_notification(request, invoice, message):
@@ -42,25 +56,118 @@ def create_invoice_notification(request, invoice, message):
         )
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+# Exportable columns and the ORM path each one reads
+INVOICE_EXPORT_COLUMNS = {
+    "id": "id",
+    "invoice_number": "invoice_number",
+    "customer": "customer_id",
+    "customer_first_name": "customer__first_name",
+    "customer_last_name": "customer__last_name",
+    "customer_email": "customer__email",
+    "issue_date": "issue_date",
+    "due_date": "due_date",
+    "amount": "amount",
+    "amount_paid": "amount_paid",
+    "balance_due": "balance_due",
+    "tax_rate": "tax_rate",
+    "discount": "discount",
+    "paid": "paid",
+}
+
+PAYMENT_EXPORT_COLUMNS = {
+    "id": "id",
+    "invoice": "invoice_id",
+    "invoice_number": "invoice__invoice_number",
+    "payment_date": "payment_date",
+    "amount": "amount",
+    "method": "method",
+}
+
+
+# Shown to a browser tab opened on a PDF link while the render runs; it
+# reloads itself until the PDF is ready instead of showing the 202 JSON.
+PDF_RETRY_PAGE = """<!doctype html>
+<html>
+<head><meta http-equiv="refresh" content="1"><title>Preparing invoice</title></head>
+<body><p>Preparing your invoice PDF&hellip;</p></body>
+</html>
+"""
+
+
+def pdf_rendering_response(request):
+    if request.get_preferred_type(["application/json", "text/html"]) == "text/html":
+        return HttpResponse(PDF_RETRY_PAGE, status=202, headers={"Retry-After": "1"})
+
+    return Response(
+        {"status": "rendering", "poll": request.build_absolute_uri()},
+        status=202,
+        headers={"Retry-After": "1"},
+    )
+
+
+class InvoiceViewSet(ReadOnlyGetMixin, viewsets.ModelViewSet):
     serializer_class = InvoiceSerializer
     authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InvoicePagination
 
     def get_queryset(self):
         user = self.request.user
-        qs = Invoice.objects.all()
+        params = self.request.query_params
+        qs = Invoice.objects.with_related()
 
         # 🔒 Non-admin users only see their own invoices
         if not user.is_superuser:
-            qs = qs.filter(customer__email__iexact=user.email)
+            qs = qs.filter(customer__email=user.email.lower())
 
         # 🔍 Optional filter: ?customer=<id>
-        customer_id = self.request.query_params.get("customer")
+        customer_id = params.get("customer")
         if customer_id:
             qs = qs.filter(customer_id=customer_id)
 
-        return qs
+        # ?paid=true|false
+        paid = params.get("paid")
+        if paid in ("true", "false"):
+            qs = qs.filter(paid=paid == "true")
+
+        # ?overdue=true → unpaid and past due
+        if params.get("overdue") == "true":
+            qs = qs.filter(paid=False, due_date__lt=timezone.localdate())
+
+        # ?issued_from=YYYY-MM-DD&issued_to=YYYY-MM-DD
+        for param, lookup in (("issued_from", "issue_date__gte"), ("issued_to", "issue_date__lte")):
+            value = params.get(param)
+            if value:
+                try:
+                    qs = qs.filter(**{lookup: datetime.strptime(value, "%Y-%m-%d").date()})
+                except ValueError:
+                    pass  # ignore invalid date silently
+
+        # ?amount_min=&amount_max=&balance_min=&balance_max=
+        for param, lookup in (
+            ("amount_min", "amount__gte"),
+            ("amount_max", "amount__lte"),
+            ("balance_min", "balance_due__gte"),
+            ("balance_max", "balance_due__lte"),
+        ):
+            value = params.get(param)
+            if value:
+                try:
+                    qs = qs.filter(**{lookup: Decimal(value)})
+                except InvalidOperation:
+                    pass
+
+        # ?search= invoice number prefix or customer name
+        search = params.get("search", "").strip()
+        if search:
+            qs = qs.filter(
+                Q(invoice_number__startswith=search)
+                | Q(customer__first_name__icontains=search)
+                | Q(customer__last_name__icontains=search)
+            )
+
+        # id breaks ties within a day so pages stay stable
+        return qs.order_by("-issue_date", "-id")
 
     def retrieve(self, request, *args, **kwargs):
         invoice = self.get_object()
@@ -108,14 +215,107 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 
     @decorators.action(detail=True, methods=["get"])
     def pdf(self, request, pk=None):
+        """
+        Serve the cached PDF, or 202 while it renders in the background.
+        """
         invoice = self.get_object()
-        pdf_file = generate_invoice_pdf(invoice)
 
-        response = HttpResponse(pdf_file, content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'inline; filename="invoice_{invoice.invoice_number}.pdf"'
+        path = rendered_pdf_path(invoice)
+        if path is None:
+            return pdf_rendering_response(request)
+
+        return invoice_pdf_response(request, invoice, path)
+
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        url_path="export-pdfs",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export_pdfs(self, request):
+        """
+        GET /api/invoices/export-pdfs/?start=YYYY-MM-DD&end=YYYY-MM-DD
+        Streams a ZIP of every invoice PDF issued in the range.
+        """
+        try:
+            start = datetime.strptime(request.query_params.get("start", ""), "%Y-%m-%d").date()
+            end = datetime.strptime(request.query_params.get("end", ""), "%Y-%m-%d").date()
+        except ValueError:
+            return Response(
+                {"error": "start and end required as YYYY-MM-DD"},
+                status=400
+            )
+
+        if end < start:
+            return Response({"error": "end must not be before start"}, status=400)
+
+        return streaming_response(
+            request,
+            iter_invoice_zip(invoices_issued_between(start, end)),
+            "application/zip",
+            f"invoices_{start}_{end}.zip",
+        )
+
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export_rows(self, request):
+        """
+        GET /api/invoices/export/?output=csv|ndjson&columns=...&start=&end=
+        Streams invoice rows filtered on issue_date.
+        """
+        return export_response(
+            request, Invoice.objects.all(), INVOICE_EXPORT_COLUMNS, "issue_date", "invoices"
         )
-        return response
+
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def search(self, request):
+        """
+        GET /api/invoices/search/?q=ridge vent&page=1&page_size=25
+        Invoices matching the words in their number, customer name or
+        email, or line item descriptions, best match first, paginated
+        like the list.
+        """
+        page = self.paginate_queryset(InvoiceSearch(request.query_params.get("q", "")))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @decorators.action(detail=True, methods=["post"], url_path="line-items")
+    def line_items(self, request, pk=None):
+        """
+        POST /api/invoices/<id>/line-items/
+        {
+            "parts": [{"id": 1, "description": ..., "quantity": ..., "unit_price": ..., "position": 0}, ...],
+            "labor": [{"description": ..., "hours": ..., "hourly_rate": ..., "position": 1}, ...],
+            "delete_parts": [2, 3],
+            "delete_labor": []
+        }
+        Rows with an id are updated, rows without are created.
+        """
+        invoice = self.get_object()
+        user = request.user
+
+        if (
+            not user.is_superuser
+            and invoice.customer.email.lower() != user.email.lower()
+        ):
+            raise PermissionDenied("Not authorized to update Invoice.")
+
+        payload = LineItemsSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        try:
+            invoice.apply_line_items(**payload.validated_data)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=400)
+
+        return Response(self.get_serializer(self.get_object()).data)
 
     @decorators.action(detail=True, methods=["post"])
     def mark_paid(self, request, pk=None):
@@ -128,10 +328,10 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             "message": "Invoice marked as paid" if invoice.paid else "Invoice marked as unpaid"
         })
 
-    @decorators.action(detail=True, methods=["get"])
+    @decorators.action(detail=True, methods=["post"])
     def send_email(self, request, pk=None):
         invoice = self.get_object()
-        to_email = request.query_params.get("to")
+        to_email = request.data.get("to") or request.query_params.get("to")
 
         result = send_invoice_email(
             to_email=to_email,
@@ -140,41 +340,136 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 
         return Response({"message": result})
 
-class PartViewSet(viewsets.ModelViewSet):
+    @decorators.action(
+        detail=False,
+        methods=["post"],
+        url_path="send-statements",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def send_statements(self, request):
+        """
+        POST /api/invoices/send-statements/
+        {"ids": [1, 2]} or {"older_than_days": 30}
+        Queues each invoice's email in the outbox and reports the
+        outcome per recipient.
+        """
+        payload = StatementBatchSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        ids = payload.validated_data.get("ids")
+        if ids:
+            invoices = Invoice.objects.filter(pk__in=ids)
+        else:
+            invoices = Invoice.objects.unpaid_older_than(
+                payload.validated_data["older_than_days"]
+            )
+
+        results = send_invoice_statements(
+            invoices.select_related("customer").order_by("issue_date", "invoice_number")
+        )
+
+        return Response({
+            "queued": sum(result["status"] == "queued" for result in results),
+            "failed": sum(result["status"] == "failed" for result in results),
+            "results": results,
+        })
+
+class ARAgingReportView(ReadOnlyGetMixin, APIView):
+    """
+    GET /api/reports/ar-aging/?as_of=YYYY-MM-DD[&output=csv]
+    Open balances per customer by days past due.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        as_of = request.query_params.get("as_of")
+        if as_of:
+            try:
+                as_of = datetime.strptime(as_of, "%Y-%m-%d").date()
+            except ValueError:
+                return Response({"error": "as_of must be YYYY-MM-DD"}, status=400)
+        else:
+            as_of = timezone.localdate()
+
+        rows = ar_aging(as_of)
+
+        if request.query_params.get("output") == "csv":
+            return csv_response(
+                request,
+                ["customer_id", "customer", "email", "invoices", *AGING_COLUMNS],
+                self._csv_rows(rows.iterator()),
+                f"ar_aging_{as_of}.csv",
+            )
+
+        rows = list(rows)
+        return Response({
+            "as_of": as_of,
+            "customers": [
+                {
+                    "customer": row["customer_id"],
+                    "customer_name": f'{row["customer__first_name"]} {row["customer__last_name"]}',
+                    "customer_email": row["customer__email"],
+                    "invoices": row["invoices"],
+                    **{key: row[key] for key in AGING_COLUMNS},
+                }
+                for row in rows
+            ],
+            "totals": aging_totals(rows),
+        })
+
+    @staticmethod
+    def _csv_rows(rows):
+        totals = aging_totals([])
+        invoices = 0
+        for row in rows:
+            invoices += row["invoices"]
+            for key in AGING_COLUMNS:
+                totals[key] += row[key]
+            yield [
+                row["customer_id"],
+                f'{row["customer__first_name"]} {row["customer__last_name"]}',
+                row["customer__email"],
+                row["invoices"],
+                *(row[key] for key in AGING_COLUMNS),
+            ]
+        yield ["", "Total", "", invoices, *(totals[key] for key in AGING_COLUMNS)]
+
+class PartViewSet(ReadOnlyGetMixin, viewsets.ModelViewSet):
     queryset = Part.objects.select_related("invoice").all()
     serializer_class = PartSerializer
     authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-class LaborViewSet(viewsets.ModelViewSet):
+class LaborViewSet(ReadOnlyGetMixin, viewsets.ModelViewSet):
     queryset = Labor.objects.select_related("invoice").all()
     serializer_class = LaborSerializer
     authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ReadOnlyGetMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.select_related("invoice").all()
     serializer_class = PaymentSerializer
     authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-    def perform_create(self, serializer):
-        payment = serializer.save()
-        payment.invoice.update_payment_status()
-
-    def retrieve(self, request, *args, **kwargs):
-        amount = self.get_object().amount
-        self.get_object().amount = amount.quantize(Decimal('0.00'), rounding=ROUND_HALF_UP)
-        self.get_object().save()
-        return super().retrieve(request, *args, **kwargs)
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export_rows(self, request):
+        """
+        GET /api/payments/export/?output=csv|ndjson&columns=...&start=&end=
+        Streams payment rows filtered on payment_date.
+        """
+        return export_response(
+            request, Payment.objects.all(), PAYMENT_EXPORT_COLUMNS, "payment_date", "payments"
+        )
 
-from rest_framework import viewsets, permissions
-from django.http import HttpResponse, Http404
-from .models import Invoice
-from .serializers import InvoiceSerializer
-from .pdf import generate_invoice_pdf  # <-- your PDF generator
 
-class CustomerInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class CustomerInvoiceViewSet(ReadOnlyGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Customer-facing invoice access.
     /api/customer-invoices/<id>/ returns PDF
@@ -197,11 +492,8 @@ class CustomerInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
         if email and invoice.customer.email.lower() != email.lower():
             raise Http404("Invoice not found")
 
-        # Generate PDF
-        pdf = generate_invoice_pdf(invoice)
+        path = rendered_pdf_path(invoice)
+        if path is None:
+            return pdf_rendering_response(request)
 
-        response = HttpResponse(pdf, content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'inline; filename="invoice_{invoice.invoice_number}.pdf"'
-        )
-        return response
\ No newline at end of file
+        return invoice_pdf_response(request, invoice, path)
\ No newline at end of file
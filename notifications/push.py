@@ -22,3 +22,39 @@ def send_mobile_push(token, title, body, data=None):
     )
 
     messaging.send(message)
+
+
+# FCM accepts at most this many messages per send_each call
+PUSH_BATCH_SIZE = 500
+
+
+def send_mobile_push_batch(pushes):
+    """
+    Send (token, title, body, data) tuples, one FCM request per
+    PUSH_BATCH_SIZE messages. Returns the number delivered.
+    """
+    if not firebase_enabled():
+        return 0
+
+    app = get_firebase_app()
+    if not app:
+        return 0
+
+    messages = [
+        messaging.Message(
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+            ),
+            data={key: str(value) for key, value in (data or {}).items()},
+            token=token,
+        )
+        for token, title, body, data in pushes
+    ]
+
+    delivered = 0
+    for i in range(0, len(messages), PUSH_BATCH_SIZE):
+        response = messaging.send_each(messages[i:i + PUSH_BATCH_SIZE], app=app)
+        delivered += response.success_count
+
+    return delivered
@@ -22,7 +22,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Notification.objects.filter(
             Q(user=user) |
-            Q(invoice__customer__email=user.email)
+            Q(invoice__customer__email=user.email.lower())
         ).distinct()
     
     @decorators.action(detail=True, methods=["post"])
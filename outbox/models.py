@@ -0,0 +1,69 @@
+from datetime import timedelta
+from django.db import models
+from django.utils import timezone
+from django.core.mail import EmailMultiAlternatives
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ("Q", "Queued"),
+        ("S", "Sent"),
+        ("F", "Failed"),
+    ]
+    MAX_ATTEMPTS = 8
+    RETRY_BASE = timedelta(minutes=1)
+    RETRY_MAX = timedelta(hours=6)
+
+    to = models.JSONField(default=list)
+    from_email = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+
+    # Invoice emails get the PDF and banner attached when they are sent
+    invoice = models.ForeignKey(
+        'invoices.Invoice',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='outbound_emails',
+    )
+
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default="Q")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.get_status_display()})"
+
+    def build_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            connection=connection,
+        )
+
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+
+        if self.invoice_id:
+            from invoices.utils import attach_invoice_files
+            attach_invoice_files(message, self.invoice)
+
+        return message
+
+    def retry_delay(self):
+        return min(self.RETRY_BASE * 2 ** self.attempts, self.RETRY_MAX)
@@ -0,0 +1,128 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed batch stays hidden from other workers
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def enqueue_email(subject, body, to, html_body="", from_email=None, invoice=None):
+    """
+    Queue an email for the send_outbox worker. Runs inside the caller's
+    transaction, so nothing is sent if that transaction rolls back.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        invoice=invoice,
+    )
+
+
+def enqueue_messages(messages):
+    """
+    Queue already-built EmailMessage objects with a single INSERT.
+    """
+    rows = []
+    for message in messages:
+        html_body = next(
+            (
+                content
+                for content, mimetype in getattr(message, "alternatives", [])
+                if mimetype == "text/html"
+            ),
+            "",
+        )
+        rows.append(OutboundEmail(
+            subject=message.subject,
+            body=message.body,
+            to=list(message.to),
+            html_body=html_body,
+            from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        ))
+
+    return OutboundEmail.objects.bulk_create(rows)
+
+
+def _claim_batch(batch_size):
+    now = timezone.now()
+
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .select_related("invoice__customer")
+            .filter(status="Q", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in batch]
+        ).update(next_attempt_at=now + CLAIM_LEASE)
+
+    return batch
+
+
+def deliver_due(batch_size=100):
+    """
+    Send one batch of due emails over a single mail connection.
+
+    Sent rows are marked in one UPDATE; failures are rescheduled with
+    exponential backoff until MAX_ATTEMPTS, then marked Failed.
+    Returns (sent, failed) counts.
+    """
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent, failures = [], []
+    connection = get_connection(fail_silently=False)
+
+    try:
+        connection.open()
+        for email in batch:
+            try:
+                email.build_message(connection).send()
+                sent.append(email.pk)
+            except Exception as e:
+                failures.append((email, e))
+    except Exception as e:
+        # Could not reach the mail server at all
+        failures = [(email, e) for email in batch if email.pk not in sent]
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.exception("Error closing mail connection")
+
+    now = timezone.now()
+
+    if sent:
+        OutboundEmail.objects.filter(pk__in=sent).update(
+            status="S",
+            sent_at=now,
+            attempts=F("attempts") + 1,
+            last_error="",
+        )
+
+    for email, error in failures:
+        attempts = email.attempts + 1
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            attempts=attempts,
+            status="F" if attempts >= OutboundEmail.MAX_ATTEMPTS else "Q",
+            next_attempt_at=now + email.retry_delay(),
+            last_error=str(error),
+        )
+        logger.warning("Email %s failed (attempt %s): %s", email.pk, attempts, error)
+
+    return len(sent), len(failures)
@@ -1,7 +1,7 @@
 from rest_framework.views import exception_handler
 import logging
-from django.core.mail import send_mail
 from django.conf import settings
+from outbox.utils import enqueue_email
 from .models import EmailVerificationToken
 
 def send_verification_email(user):
@@ -11,17 +11,15 @@ def send_verification_email(user):
         f"{settings.FRONTEND_URL}/api/users/verify-email/{token_obj.token}/"
     )
 
-    send_mail(
+    enqueue_email(
         subject="Verify your email address",
-        message=(
+        body=(
             f"Hello {user.username},\n\n"
             f"Please verify your email by clicking the link below:\n\n"
             f"{verification_link}\n\n"
             f"If you didn’t create this account, ignore this email."
         ),
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False,
+        to=[user.email],
     )
     
 logger = logging.getLogger("django.request")
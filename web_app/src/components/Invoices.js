@@ -19,11 +19,14 @@ const { Search } = Input;
 const { useBreakpoint } = Grid;
 
 const API = "/api/invoices/";
+const PAGE_SIZE = 25;
 
 export default function Invoices() {
   const [invoices, setInvoices] = useState([]);
   const [loading, setLoading] = useState(false);
   const [search, setSearch] = useState("");
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
   const token = localStorage.getItem("authToken");
   const navigate = useNavigate();
@@ -32,15 +35,21 @@ export default function Invoices() {
 
   useEffect(() => {
     fetchInvoices();
-  }, []);
+  }, [page, search]);
 
   const fetchInvoices = async () => {
     try {
       setLoading(true);
       const res = await axios.get(API, {
         headers: { Authorization: `Token ${token}` },
+        params: {
+          page,
+          page_size: PAGE_SIZE,
+          search: search.trim() || undefined,
+        },
       });
-      setInvoices(Array.isArray(res.data) ? res.data : res.data.results || []);
+      setInvoices(res.data.results || []);
+      setTotal(res.data.count || 0);
     } catch (err) {
       console.error(err);
       message.error("Failed to load invoices");
@@ -49,14 +58,12 @@ export default function Invoices() {
     }
   };
 
-  const filteredInvoices = invoices.filter((inv) => {
-    if (!search.trim()) return true;
-    const term = search.toLowerCase();
-    return (
-      String(inv.invoice_number).toLowerCase().includes(term) ||
-      (inv.customer_name || "").toLowerCase().includes(term)
-    );
-  });
+  const pagination = {
+    current: page,
+    pageSize: PAGE_SIZE,
+    total,
+    onChange: setPage,
+  };
 
   return (
     <Card
@@ -77,7 +84,10 @@ export default function Invoices() {
         <Search
           placeholder="Search invoice # or customer"
           allowClear
-          onChange={(e) => setSearch(e.target.value)}
+          onSearch={(value) => {
+            setPage(1);
+            setSearch(value);
+          }}
           style={{ maxWidth: 300 }}
         />
       </Space>
@@ -86,7 +96,8 @@ export default function Invoices() {
       {isMobile ? (
         <List
           loading={loading}
-          dataSource={filteredInvoices}
+          dataSource={invoices}
+          pagination={pagination}
           locale={{ emptyText: "No invoices found" }}
           renderItem={(inv) => (
             <Card
@@ -142,12 +153,12 @@ export default function Invoices() {
         /* DESKTOP VIEW */
         <Table
           loading={loading}
-          dataSource={filteredInvoices}
+          dataSource={invoices}
           rowKey="id"
           onRow={(record) => ({
             onClick: () => navigate(`/invoices/${record.id}`),
           })}
-          pagination={{ pageSize: 15 }}
+          pagination={pagination}
           columns={[
             {
               title: "Invoice #",
@@ -19,6 +19,18 @@ const START_HOUR = 9;
 const END_HOUR = 19;
 const HOUR_HEIGHT = 60;
 
+// Follow the keyset cursor until the last page so no rows are dropped
+async function fetchAllPages(url) {
+  const rows = [];
+  let next = url;
+  while (next) {
+    const res = await axios.get(next);
+    rows.push(...res.data.results);
+    next = res.data.next;
+  }
+  return rows;
+}
+
 export default function Appointments() {
   const [appointments, setAppointments] = useState([]);
   const [pendingAppointments, setPendingAppointments] = useState([]);
@@ -27,8 +39,7 @@ export default function Appointments() {
 
   const loadAppointments = async () => {
     try {
-      const res = await axios.get(`${API}?status=A`);
-      setAppointments(res.data);
+      setAppointments(await fetchAllPages(`${API}?status=A&page_size=500`));
     } catch {
       message.error("Failed to load appointments");
     }
@@ -36,8 +47,9 @@ export default function Appointments() {
 
   const loadPendingAppointments = async () => {
     try {
-      const res = await axios.get(`${API}pending/`);
-      setPendingAppointments(res.data);
+      setPendingAppointments(
+        await fetchAllPages(`${API}pending/?page_size=500`)
+      );
     } catch {
       message.error("Failed to load pending appointments");
     }
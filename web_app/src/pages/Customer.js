@@ -39,29 +39,40 @@ const STATES = [
   ["WI", "Wisconsin"], ["WY", "Wyoming"],
 ];
 
+const INVOICE_PAGE_SIZE = 25;
+
 export function Customer() {
   const { id } = useParams();
   const [form] = Form.useForm();
   const token = localStorage.getItem("authToken");
   const [invoices, setInvoices] = useState([]);
+  const [invoicePage, setInvoicePage] = useState(1);
+  const [invoiceTotal, setInvoiceTotal] = useState(0);
   const [invoiceModal, setInvoiceModal] = useState(false);
   const [invoiceForm] = Form.useForm();
   const navigate = useNavigate();
 
+  const loadInvoices = async (page) => {
+    const res = await axios.get("/api/invoices/", {
+      headers: { Authorization: `Token ${token}` },
+      params: { customer: id, page, page_size: INVOICE_PAGE_SIZE },
+    });
+    setInvoices(res.data.results);
+    setInvoiceTotal(res.data.count);
+  };
+
   useEffect(() => {
     axios
       .get(`${API}${id}/`, {
         headers: { Authorization: `Token ${token}` },
       })
       .then((res) => form.setFieldsValue(res.data));
-
-    axios
-      .get(`/api/invoices/?customer=${id}`, {
-        headers: { Authorization: `Token ${token}` },
-      })
-      .then((res) => setInvoices(res.data));
   }, [id]);
 
+  useEffect(() => {
+    loadInvoices(invoicePage);
+  }, [id, invoicePage]);
+
   const onFinish = async (values) => {
     await axios.put(`${API}${id}/`, values, {
       headers: { Authorization: `Token ${token}` },
@@ -78,10 +89,12 @@ export function Customer() {
 
     message.success("Invoice created");
 
-    const res = await axios.get(`/api/invoices/?customer=${id}`, {
-        headers: { Authorization: `Token ${token}` },
-    });
-    setInvoices(res.data);
+    // Newest invoices come first, so the new one is on page 1
+    if (invoicePage === 1) {
+      loadInvoices(1);
+    } else {
+      setInvoicePage(1);
+    }
   };
   return (
     <Card title="Customer Profile" style={{ maxWidth: 1100, margin: "auto" }}>
@@ -162,6 +175,12 @@ export function Customer() {
     <Table
     dataSource={invoices}
     rowKey="id"
+    pagination={{
+        current: invoicePage,
+        pageSize: INVOICE_PAGE_SIZE,
+        total: invoiceTotal,
+        onChange: setInvoicePage,
+    }}
     style={{ marginTop: 16, cursor: "pointer" }}
     onRow={(record) => ({
         onClick: () => {
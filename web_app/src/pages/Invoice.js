@@ -221,7 +221,11 @@ const updateInvoice = (field, value) => {
   };
 
   const sendEmail = async () => {
-    const res = await axios.get(`${API}/invoices/${id}/send_email/?to=${invoice.customer_email}`, { headers } );
+    const res = await axios.post(
+      `${API}/invoices/${id}/send_email/`,
+      { to: invoice.customer_email },
+      { headers }
+    );
     message.success("Invoice sent to customer");
     console.log(res.data);
   };
@@ -5,18 +5,22 @@ import { useNavigate } from "react-router-dom";
 
 const { Title, Text } = Typography;
 const API = "/invoices/";
+const PAGE_SIZE = 25;
 
 export default function MyInvoices() {
   const [invoices, setInvoices] = useState([]);
   const [selectedInvoice, setSelectedInvoice] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
   const navigate = useNavigate();
 
   const loadInvoices = async () => {
     setLoading(true);
     try {
-      const res = await api.get(API);
-      setInvoices(res.data);
+      const res = await api.get(API, { params: { page, page_size: PAGE_SIZE } });
+      setInvoices(res.data.results);
+      setTotal(res.data.count);
     } catch {
       message.error("Failed to load invoices");
     } finally {
@@ -26,7 +30,7 @@ export default function MyInvoices() {
 
   useEffect(() => {
     loadInvoices();
-  }, []);
+  }, [page]);
 
   const openPDF = (id) => {
     if (!id) {
@@ -44,6 +48,12 @@ export default function MyInvoices() {
         <Card style={{ width: 320 }}>
           <List
             dataSource={invoices}
+            pagination={{
+              current: page,
+              pageSize: PAGE_SIZE,
+              total,
+              onChange: setPage,
+            }}
             locale={{ emptyText: "No invoices found" }}
             renderItem={(inv) => (
               <List.Item
@@ -22,6 +22,18 @@ export default function PublicRescheduleAppointment() {
       .catch(() => message.error("Invalid or expired link"));
   }, [token]);
 
+  const holdSlot = async (time) => {
+    try {
+      await axios.post(`${API}/reschedule/${token}/hold/`, {
+        date: appointment.requested_date,
+        time,
+      });
+      setSelectedTime(time);
+    } catch (err) {
+      message.error(err.response?.data?.error || "That time is no longer available");
+    }
+  };
+
   const submitReschedule = async () => {
     try {
       await axios.post(`${API}/reschedule/${token}/`, {
@@ -30,8 +42,8 @@ export default function PublicRescheduleAppointment() {
       });
 
       message.success("Appointment rescheduled!");
-    } catch {
-      message.error("Reschedule failed");
+    } catch (err) {
+      message.error(err.response?.data?.error || "Reschedule failed");
     }
   };
 
@@ -54,7 +66,7 @@ export default function PublicRescheduleAppointment() {
           <Button
             key={s.time}
             type={selectedTime === s.time ? "primary" : "default"}
-            onClick={() => setSelectedTime(s.time)}
+            onClick={() => holdSlot(s.time)}
           >
             {s.label}
           </Button>